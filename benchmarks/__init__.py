@@ -0,0 +1 @@
+"""Benchmarks of the integration, run them from the repository root with ``python -m``."""
@@ -0,0 +1,71 @@
+"""
+Measure the cost of parsing websocket frames into typed event records.
+
+Times decoding a frame and running the parser and queue key of its event, the work
+the listener does for every frame before an event reaches its handlers:
+
+    python -m benchmarks.parse_events --number 100000
+"""
+import argparse
+import functools
+import json
+import timeit
+from typing import Dict
+
+from custom_components.digitalstrom.const import (
+    EVENT_BUTTON_CLICK,
+    EVENT_CALL_SCENE,
+    EVENT_DEVICE_SENSOR_VALUE,
+    EVENT_ZONE_SENSOR_VALUE,
+)
+from custom_components.digitalstrom.events import KEYS, PARSERS
+from dss_simulator import button_click_event, call_scene_event, zone_sensor_event
+
+FRAMES: Dict[str, str] = {
+    EVENT_CALL_SCENE: json.dumps(call_scene_event(zone_id=12, group_id=1, scene_id=5)),
+    EVENT_ZONE_SENSOR_VALUE: json.dumps(
+        zone_sensor_event(zone_id=12, sensor_type=9, value=21.5)
+    ),
+    EVENT_DEVICE_SENSOR_VALUE: json.dumps(
+        {
+            "name": "deviceSensorValue",
+            "properties": {
+                "sensorIndex": "2",
+                "sensorType": "4",
+                "sensorValueFloat": "57.3",
+            },
+            "source": {"dSUID": "303505d7f8000000000000400000a4c800", "zoneID": 12},
+        }
+    ),
+    EVENT_BUTTON_CLICK: json.dumps(
+        button_click_event(dsid="303505d7f8000000000000400000a4c800", click_type=0)
+    ),
+}
+
+
+def parse(frame: str) -> None:
+    event: dict = json.loads(frame)
+    name: str = event["name"]
+    KEYS[name](PARSERS[name](event))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.parse_events")
+    parser.add_argument("--number", type=int, default=100000, help="frames per run")
+    parser.add_argument("--repeat", type=int, default=5, help="runs, the best counts")
+    args = parser.parse_args()
+
+    print(f"parsing one frame, best of {args.repeat} runs of {args.number}:")
+    name: str
+    frame: str
+    for name, frame in FRAMES.items():
+        best: float = min(
+            timeit.repeat(
+                functools.partial(parse, frame), number=args.number, repeat=args.repeat
+            )
+        )
+        print(f"  {name:<18} {best / args.number * 1e6:.2f}us")
+
+
+if __name__ == "__main__":
+    main()
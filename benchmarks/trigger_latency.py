@@ -0,0 +1,117 @@
+"""
+Measure the time from a button click on the dSS to its event on the Home Assistant bus.
+
+Runs the listener and button dispatcher of the integration against a simulator on its
+own thread, so the clicks cross a real websocket connection:
+
+    python -m benchmarks.trigger_latency --clicks 200
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import List
+
+from homeassistant.core import Event, HomeAssistant, callback
+from pydigitalstrom.apptokenhandler import DSAppTokenHandler
+from pydigitalstrom.client import DSClient
+
+from custom_components.digitalstrom.const import (
+    BUS_EVENT,
+    EVENT_BUTTON_CLICK,
+    LISTENER_EVENTS,
+)
+from custom_components.digitalstrom.dispatcher import DSButtonDispatcher
+from custom_components.digitalstrom.listener import DSMultiplexEventListener
+from dss_simulator import DSSimulator, DSSimulatorThread, button_click_event, free_port
+
+
+async def measure(thread: DSSimulatorThread, clicks: int, interval: float) -> List[float]:
+    simulator: DSSimulator = thread.simulator
+    hass = HomeAssistant()
+
+    apptoken: str = await DSAppTokenHandler(
+        host=simulator.host,
+        port=simulator.port,
+        username=simulator.username,
+        password=simulator.password,
+    ).request_apptoken()
+    client = DSClient(
+        host=simulator.host,
+        port=simulator.port,
+        apptoken=apptoken,
+        apartment_name="Apartment",
+        loop=asyncio.get_running_loop(),
+    )
+    await client.initialize()
+
+    listener = DSMultiplexEventListener(client=client, event_names=LISTENER_EVENTS)
+    dispatcher = DSButtonDispatcher(hass=hass)
+    button: dict = simulator.buttons[0]
+    dispatcher.register(
+        dsids=[button["dSUID"], button["id"]], device_id="button", inputs=1
+    )
+    listener.register(callback=dispatcher.handle_event, event_name=EVENT_BUTTON_CLICK)
+
+    received: asyncio.Queue = asyncio.Queue()
+
+    @callback
+    def bus_event(event: Event) -> None:
+        received.put_nowait((time.perf_counter(), event))
+
+    hass.bus.async_listen(BUS_EVENT, bus_event)
+
+    listen = asyncio.ensure_future(listener.start())
+    while not simulator.connections:
+        await asyncio.sleep(0.01)
+
+    latencies: List[float] = []
+    try:
+        for _ in range(clicks):
+            sent: float = time.perf_counter()
+            await thread.async_call(
+                simulator.emit(
+                    event=button_click_event(dsid=button["dSUID"], click_type=0)
+                )
+            )
+            fired, event = await asyncio.wait_for(received.get(), timeout=5)
+            if event.data["device_id"] != "button":
+                raise RuntimeError(f"unexpected bus event {event}")
+            latencies.append((fired - sent) * 1000)
+            await asyncio.sleep(interval)
+    finally:
+        await listener.stop()
+        listen.cancel()
+        await hass.async_stop(force=True)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.trigger_latency")
+    parser.add_argument("--clicks", type=int, default=100, help="number of clicks")
+    parser.add_argument(
+        "--interval", type=float, default=50, help="pause between clicks in ms"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    thread = DSSimulatorThread(simulator=DSSimulator(port=free_port()))
+    thread.start()
+    try:
+        latencies: List[float] = asyncio.run(
+            measure(thread=thread, clicks=args.clicks, interval=args.interval / 1000)
+        )
+    finally:
+        thread.stop()
+
+    latencies.sort()
+    print(f"button click to bus event over {len(latencies)} clicks:")
+    print(f"  min    {latencies[0]:.2f}ms")
+    print(f"  median {statistics.median(latencies):.2f}ms")
+    print(f"  p95    {latencies[int(len(latencies) * 0.95) - 1]:.2f}ms")
+    print(f"  max    {latencies[-1]:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Custom integrations, a package so tests import them instead of the test harness placeholder."""
@@ -1,12 +1,18 @@
 """The digitalSTROM integration."""
 import asyncio
+import functools
+import hashlib
+import json
 import logging
+import re
 import socket
 import urllib3
+import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    ATTR_ENTITY_ID,
     CONF_HOST,
     CONF_PORT,
     CONF_USERNAME,
@@ -18,31 +24,98 @@ from homeassistant.const import (
 )
 from homeassistant.core import callback
 from homeassistant.exceptions import ConfigEntryNotReady, InvalidStateError
+from homeassistant.helpers import (
+    area_registry,
+    config_validation,
+    device_registry,
+    entity_registry,
+)
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.typing import ConfigType, HomeAssistantType
 from homeassistant.util import slugify
 
 from pydigitalstrom.client import DSClient
 from pydigitalstrom.exceptions import DSException
-from pydigitalstrom.websocket import DSWebsocketEventListener
 
 from .const import (
     DOMAIN,
     HOST_FORMAT,
     SLUG_FORMAT,
     CONF_DELAY,
+    CONF_STRUCTURE_HASH,
     DEFAULT_DELAY,
+    EVENT_CALL_SCENE,
+    EVENT_ZONE_SENSOR_VALUE,
+    EVENT_DEVICE_SENSOR_VALUE,
+    EVENT_BUTTON_CLICK,
+    LISTENER_EVENTS,
+    OPTION_ACK_TIMEOUT,
+    OPTION_ACK_TIMEOUT_DEFAULT,
+    OPTION_COMMAND_QUEUE,
+    OPTION_COMMAND_QUEUE_DEFAULT,
+    OPTION_COMMAND_TTL,
+    OPTION_COMMAND_TTL_DEFAULT,
+    OPTION_EVENT_OVERFLOW,
+    OPTION_EVENT_OVERFLOW_DEFAULT,
+    OPTION_EVENT_QUEUE_SIZE,
+    OPTION_EVENT_QUEUE_SIZE_DEFAULT,
+    OPTION_PROFILING,
+    OPTION_PROFILING_DEFAULT,
+    OPTION_SLOW_THRESHOLD,
+    OPTION_SLOW_THRESHOLD_DEFAULT,
+    PROFILE_DEFAULT_DURATION,
+    SERVICE_PROFILE,
+    SERVICE_SCHEDULE_SCENES,
+    STORAGE_VERSION,
+    STORAGE_COMMANDS_FORMAT,
 )
-from .util import slugify_entry
+from .commandstack import DSCommandQueue
+from .dispatcher import DSButtonDispatcher, DSSensorDispatcher
+from .listener import DSMultiplexEventListener
+from .profiling import DSProfiler, async_profile
+from .scheduler import ACTION_OFF, ACTION_ON, async_schedule_scenes
+from .tracker import DSCommandTracker
+from .util import slugify_entry, zone_device_info, zone_identifier
 
 _LOGGER = logging.getLogger(__name__)
 
-COMPONENT_TYPES = ["light", "switch", "cover", "scene"]
+COMPONENT_TYPES = ["light", "switch", "cover", "scene", "sensor"]
+
+URL_DEVICES = "/json/apartment/getDevices"
+
+# device identifiers of former per scene devices, the unique id of the scene
+SCENE_IDENTIFIER = re.compile(r"^\d+_\d+(_\d+)?$")
+
+PROFILE_SCHEMA = vol.Schema(
+    {vol.Optional("duration", default=PROFILE_DEFAULT_DURATION): vol.Coerce(int)}
+)
+
+SCHEDULE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): config_validation.entity_ids,
+        vol.Required("action"): vol.In([ACTION_ON, ACTION_OFF]),
+        vol.Optional("at"): vol.Any(config_validation.time, config_validation.datetime),
+    }
+)
 
 
 async def async_setup(hass: HomeAssistantType, config: ConfigType) -> bool:
     """
     load configuration for digitalSTROM component
     """
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        functools.partial(async_profile, hass),
+        schema=PROFILE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SCHEDULE_SCENES,
+        functools.partial(async_schedule_scenes, hass),
+        schema=SCHEDULE_SCHEMA,
+    )
+
     # not configured
     if DOMAIN not in config:
         return True
@@ -78,13 +151,78 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
         stack_delay=entry.data.get(CONF_DELAY, DEFAULT_DELAY),
         loop=hass.loop,
     )
-    listener = DSWebsocketEventListener(client=client, event_name="callScene")
+    entry_slug = slugify_entry(host=entry.data[CONF_HOST], port=entry.data[CONF_PORT])
+
+    # match scene calls with their echo to measure and confirm them
+    tracker = DSCommandTracker(
+        hass=hass,
+        client=client,
+        entry_slug=entry_slug,
+        timeout=entry.options.get(OPTION_ACK_TIMEOUT, OPTION_ACK_TIMEOUT_DEFAULT),
+    )
+
+    # replace the plain command stack with one that copes with outages
+    store = None
+    if entry.options.get(OPTION_COMMAND_QUEUE, OPTION_COMMAND_QUEUE_DEFAULT):
+        store = Store(
+            hass, STORAGE_VERSION, STORAGE_COMMANDS_FORMAT.format(slug=entry_slug)
+        )
+    client.stack = DSCommandQueue(
+        hass=hass,
+        client=client,
+        entry_slug=entry_slug,
+        delay=entry.data.get(CONF_DELAY, DEFAULT_DELAY),
+        store=store,
+        ttl=entry.options.get(OPTION_COMMAND_TTL, OPTION_COMMAND_TTL_DEFAULT),
+        tracker=tracker,
+    )
+    await client.stack.load()
+
+    # opt-in timing of event handlers and requests
+    profiler = None
+    if entry.options.get(OPTION_PROFILING, OPTION_PROFILING_DEFAULT):
+        profiler = DSProfiler(
+            host=client.host,
+            threshold=entry.options.get(
+                OPTION_SLOW_THRESHOLD, OPTION_SLOW_THRESHOLD_DEFAULT
+            ),
+        )
+        client.request = profiler.wrap_request(request=client.request)
+
+    listener = DSMultiplexEventListener(
+        client=client,
+        event_names=LISTENER_EVENTS,
+        profiler=profiler,
+        queue_size=entry.options.get(
+            OPTION_EVENT_QUEUE_SIZE, OPTION_EVENT_QUEUE_SIZE_DEFAULT
+        ),
+        overflow=entry.options.get(OPTION_EVENT_OVERFLOW, OPTION_EVENT_OVERFLOW_DEFAULT),
+    )
+
+    listener.observe(callback=tracker.observe_event, event_name=EVENT_CALL_SCENE)
+
+    # sensor values are routed to their entities by an indexed dispatcher
+    sensor_dispatcher = DSSensorDispatcher(profiler=profiler)
+    listener.register(
+        callback=sensor_dispatcher.handle_event, event_name=EVENT_ZONE_SENSOR_VALUE
+    )
+    listener.register(
+        callback=sensor_dispatcher.handle_event, event_name=EVENT_DEVICE_SENSOR_VALUE
+    )
+
+    # button clicks go to the event bus without any entity in between
+    button_dispatcher = DSButtonDispatcher(hass=hass)
+    listener.register(
+        callback=button_dispatcher.handle_event, event_name=EVENT_BUTTON_CLICK
+    )
 
     # store client in hass data for future usage
-    entry_slug = slugify_entry(host=entry.data[CONF_HOST], port=entry.data[CONF_PORT])
     hass.data[DOMAIN].setdefault(entry_slug, dict())
     hass.data[DOMAIN][entry_slug]["client"] = client
     hass.data[DOMAIN][entry_slug]["listener"] = listener
+    hass.data[DOMAIN][entry_slug]["tracker"] = tracker
+    hass.data[DOMAIN][entry_slug]["sensor_dispatcher"] = sensor_dispatcher
+    hass.data[DOMAIN][entry_slug]["button_dispatcher"] = button_dispatcher
 
     # load all scenes from digitalSTROM server
     # this fails often on the first connection, but works on the second
@@ -99,6 +237,14 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
     # we're connected
     _LOGGER.debug(f"Successfully retrieved session token from digitalSTROM server at {client.host}")
 
+    # one device per zone, mapped to areas
+    async_register_zones(hass=hass, entry=entry, client=client, entry_slug=entry_slug)
+
+    # register buttons as devices for device triggers
+    await async_register_buttons(
+        hass=hass, entry=entry, client=client, button_dispatcher=button_dispatcher
+    )
+
     # register devices
     for component in COMPONENT_TYPES:
         hass.async_create_task(
@@ -118,7 +264,136 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry) -> bool
         _LOGGER.debug(f"loops stopped for digitalSTROM server at {client.host}")
         hass.async_add_job(client.stack.stop)
         hass.async_add_job(listener.stop)
+        tracker.async_cancel()
+        if "cover_planner" in hass.data[DOMAIN][entry_slug]:
+            hass.data[DOMAIN][entry_slug]["cover_planner"].async_cancel()
 
     hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, digitalstrom_stop_loops)
 
     return True
+
+
+@callback
+def async_register_zones(
+    hass: HomeAssistantType, entry: ConfigEntry, client: DSClient, entry_slug: str
+) -> None:
+    """
+    assign zone devices to areas and clean up old devices when the zone
+    structure changed
+
+    entities still link to their zone device through device_info, which
+    only looks up the device created here. assigning areas and moving
+    entities off the former per scene devices is done on the first start
+    and whenever zones are added, removed or renamed
+    """
+    zones: dict = {}
+    for scene in client.get_scenes().values():
+        zones[scene.zone_id] = scene.zone_name
+
+    structure_hash: str = hashlib.sha1(
+        json.dumps(sorted(zones.items())).encode()
+    ).hexdigest()
+    if entry.data.get(CONF_STRUCTURE_HASH) == structure_hash:
+        return
+
+    _LOGGER.debug(f"zone structure of digitalSTROM server at {client.host} changed")
+    areas = area_registry.async_get(hass)
+    devices = device_registry.async_get(hass)
+    zone_devices: dict = {}
+    for zone_id, zone_name in zones.items():
+        device = devices.async_get_or_create(
+            config_entry_id=entry.entry_id,
+            **zone_device_info(entry_slug=entry_slug, zone_id=zone_id, zone_name=zone_name),
+        )
+        zone_devices[zone_id] = device.id
+
+        # the apartment is no area, leave areas assigned by the user alone
+        if zone_id == 0 or device.area_id:
+            continue
+        area = areas.async_get_area_by_name(zone_name) or areas.async_create(zone_name)
+        devices.async_update_device(device.id, area_id=area.id)
+
+    # remove devices of removed zones and the former per scene devices, also
+    # of scenes that are gone. removing a device removes its entities, so
+    # move them to their zone first
+    entities = entity_registry.async_get(hass)
+    identifiers: set = {
+        zone_identifier(entry_slug=entry_slug, zone_id=zone_id) for zone_id in zones
+    }
+    for device in device_registry.async_entries_for_config_entry(devices, entry.entry_id):
+        device_identifiers: set = {
+            identifier for domain, identifier in device.identifiers if domain == DOMAIN
+        }
+        if device_identifiers & identifiers:
+            continue
+
+        zone_device_id: str = None
+        identifier: str
+        for identifier in device_identifiers:
+            if identifier in client.get_scenes():
+                zone_device_id = zone_devices[client.get_scenes()[identifier].zone_id]
+            elif identifier == f"apartment_{entry_slug}":
+                zone_device_id = zone_devices.get(0)
+            elif not (
+                identifier.startswith(f"{entry_slug}_zone")
+                or SCENE_IDENTIFIER.match(identifier)
+            ):
+                continue
+            break
+        else:
+            continue
+
+        if zone_device_id is not None:
+            for entity in entity_registry.async_entries_for_device(
+                entities, device.id, include_disabled_entities=True
+            ):
+                # updates the device of the existing entry, keeping user settings
+                entities.async_get_or_create(
+                    entity.domain,
+                    entity.platform,
+                    entity.unique_id,
+                    device_id=zone_device_id,
+                )
+        devices.async_remove_device(device.id)
+
+    hass.config_entries.async_update_entry(
+        entry, data={**entry.data, CONF_STRUCTURE_HASH: structure_hash}
+    )
+
+
+async def async_register_buttons(
+    hass: HomeAssistantType,
+    entry: ConfigEntry,
+    client: DSClient,
+    button_dispatcher: DSButtonDispatcher,
+) -> None:
+    """
+    add every digitalSTROM device with button inputs to the device registry
+    """
+    try:
+        response: dict = await client.request(url=URL_DEVICES)
+    except (DSException, RuntimeError, ConnectionResetError):
+        _LOGGER.warning(f"failed to load buttons from digitalSTROM server at {client.host}")
+        return
+
+    registry = device_registry.async_get(hass)
+    device: dict
+    for device in response.get("result", []):
+        inputs: int = device.get("buttonInputCount", 0)
+        if not inputs:
+            continue
+
+        dsids: list = [dsid for dsid in (device.get("dSUID"), device.get("id")) if dsid]
+        if not dsids:
+            continue
+
+        registry_entry = registry.async_get_or_create(
+            config_entry_id=entry.entry_id,
+            identifiers={(DOMAIN, dsids[0])},
+            name=device.get("name") or dsids[0],
+            model="DSButton",
+            manufacturer="digitalSTROM AG",
+        )
+        button_dispatcher.register(
+            dsids=dsids, device_id=registry_entry.id, inputs=inputs
+        )
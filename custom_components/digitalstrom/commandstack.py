@@ -0,0 +1,221 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+import logging
+import time
+from typing import List, Tuple
+
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import HomeAssistantType
+from pydigitalstrom.client import DSClient
+from pydigitalstrom.commandstack import DSCommandStack
+from pydigitalstrom.exceptions import DSCommandFailedException, DSException
+
+from .const import (
+    COMMAND_RETRY_DELAY,
+    COMMAND_MAX_RETRY_DELAY,
+    OPTION_COMMAND_TTL_DEFAULT,
+    SIGNAL_COMMAND_QUEUE,
+)
+from .tracker import DSCommandTracker
+from .util import command_target
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSCommandQueue(DSCommandStack):
+    """
+    paced command stack that survives an unreachable digitalSTROM server
+
+    without a store, commands that fail are logged and dropped instead of
+    stopping the stack. with a store the queue is durable: commands are kept
+    and retried in order until the server is back, expire after their ttl,
+    replace queued commands for the same target and survive a restart
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        client: DSClient,
+        entry_slug: str,
+        delay: int = 500,
+        store: Store = None,
+        ttl: int = OPTION_COMMAND_TTL_DEFAULT,
+        tracker: DSCommandTracker = None,
+    ):
+        super().__init__(client=client, delay=delay)
+        self.task = None
+        self._hass: HomeAssistantType = hass
+        self._entry_slug: str = entry_slug
+        self._store: Store = store
+        self._ttl: int = ttl
+        self._tracker: DSCommandTracker = tracker
+        # queued (url, unix timestamp) pairs, oldest first
+        self._stack: List[Tuple[str, float]] = []
+        # command being sent, it can't be taken back anymore
+        self._sending: Tuple[str, float] = None
+        self.online: bool = True
+        self.expired: int = 0
+
+    @property
+    def delay(self) -> int:
+        """pause between two commands in ms"""
+        return self._delay
+
+    @property
+    def depth(self) -> int:
+        return len(self._stack)
+
+    def queued(self, url: str) -> bool:
+        """whether a command for the same target waits to be sent"""
+        target: tuple = command_target(url=url)
+        return any(command_target(url=command[0]) == target for command in self._stack)
+
+    def discard(self, url: str) -> int:
+        """drop waiting commands for the same target, returns how many"""
+        target: tuple = command_target(url=url)
+        depth: int = self.depth
+        self._stack = [
+            command
+            for command in self._stack
+            if command is self._sending or command_target(url=command[0]) != target
+        ]
+        if self.depth < depth:
+            self._changed()
+        return depth - self.depth
+
+    async def load(self) -> None:
+        """restore commands queued before the last shutdown"""
+        if self._store is None:
+            return
+
+        data: dict = await self._store.async_load() or {}
+        self.expired = data.get("expired", 0)
+        self._stack = [
+            (command["url"], command["queued"]) for command in data.get("commands", [])
+        ]
+        self._expire()
+        _LOGGER.debug(f"restored {self.depth} queued commands for {self._client.host}")
+        self._changed()
+
+    async def append(self, url: str) -> None:
+        if self._store is not None:
+            target: tuple = command_target(url=url)
+            self._stack = [
+                command
+                for command in self._stack
+                if command_target(url=command[0]) != target
+            ]
+        self._stack.append((url, time.time()))
+        self._changed()
+
+    async def execute(self) -> None:
+        retry_delay: float = COMMAND_RETRY_DELAY
+        # whether the current command was retried with a new session token
+        refreshed: bool = False
+        while True:
+            self._expire()
+
+            # check for command to execute
+            if len(self._stack) > 0:
+                # append() may replace the command while it is being sent
+                command: Tuple[str, float] = self._stack[0]
+                url: str = command[0]
+                self._sending = command
+                if self._tracker is not None:
+                    self._tracker.sending(url=url)
+                try:
+                    await self._client.request(url=url)
+                except DSCommandFailedException:
+                    if not refreshed:
+                        # the session may have timed out on the server, retry
+                        # once with a new token before dropping the command
+                        refreshed = True
+                        self._refresh_session()
+                        self._sending = None
+                        continue
+                    _LOGGER.error(f"digitalSTROM server at {self._client.host} rejected {url}")
+                    if self._tracker is not None:
+                        self._tracker.failed(url=url)
+                except (DSException, RuntimeError, OSError, asyncio.TimeoutError):
+                    if self._store is not None:
+                        # keep the command and wait for the server to come back
+                        if self.online:
+                            _LOGGER.warning(
+                                f"digitalSTROM server at {self._client.host} unreachable, "
+                                f"queueing commands"
+                            )
+                        self.online = False
+                        self._sending = None
+                        self._refresh_session()
+                        await asyncio.sleep(retry_delay)
+                        retry_delay = min(retry_delay * 2, COMMAND_MAX_RETRY_DELAY)
+                        continue
+                    _LOGGER.error(f"failed to send {url} to {self._client.host}")
+                    if self._tracker is not None:
+                        self._tracker.failed(url=url)
+                else:
+                    if self._tracker is not None:
+                        self._tracker.sent(url=url)
+                    if not self.online:
+                        _LOGGER.info(
+                            f"digitalSTROM server at {self._client.host} is back, "
+                            f"replaying {self.depth - 1} queued commands"
+                        )
+                    self.online = True
+                    retry_delay = COMMAND_RETRY_DELAY
+
+                self._sending = None
+                refreshed = False
+                self._stack = [queued for queued in self._stack if queued is not command]
+                self._changed()
+
+            # sleep for x ms before next execution to not overload the DS server
+            await asyncio.sleep(self._delay / 1000)
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._store is not None:
+            await self._store.async_save(self._data())
+
+    def _expire(self) -> None:
+        if self._store is None or not self._stack:
+            return
+
+        deadline: float = time.time() - self._ttl
+        expired: List[Tuple[str, float]] = [
+            command for command in self._stack if command[1] < deadline
+        ]
+        if not expired:
+            return
+
+        self._stack = [command for command in self._stack if command[1] >= deadline]
+        self.expired += len(expired)
+        _LOGGER.warning(f"dropped {len(expired)} expired commands for {self._client.host}")
+        if self._tracker is not None:
+            command: Tuple[str, float]
+            for command in expired:
+                self._tracker.failed(url=command[0])
+        self._changed()
+
+    def _refresh_session(self) -> None:
+        """
+        log in again with the next request
+
+        failed requests count as activity for the client, so after an outage
+        it would keep using a session the server has already dropped
+        """
+        self._client._last_request = None
+
+    def _data(self) -> dict:
+        return {
+            "expired": self.expired,
+            "commands": [{"url": url, "queued": queued} for url, queued in self._stack],
+        }
+
+    def _changed(self) -> None:
+        if self._store is not None:
+            self._store.async_delay_save(self._data, 1)
+        async_dispatcher_send(
+            self._hass, SIGNAL_COMMAND_QUEUE.format(slug=self._entry_slug)
+        )
@@ -1,4 +1,7 @@
 """Config flow to configure the digitalSTROM component."""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 import voluptuous as vol
 
@@ -29,12 +32,36 @@ from .const import (
     DEFAULT_PORT,
     DEFAULT_DELAY,
     DEFAULT_USERNAME,
+    EVENT_OVERFLOW_DROP_OLDEST,
+    EVENT_OVERFLOW_KEEP_LATEST,
+    PROBE_CACHE_TTL,
+    PROBE_PORTS,
+    PROBE_TIMEOUT,
     TITLE_FORMAT,
+    OPTION_ACK_TIMEOUT,
+    OPTION_ACK_TIMEOUT_DEFAULT,
+    OPTION_COMMAND_QUEUE,
+    OPTION_COMMAND_QUEUE_DEFAULT,
+    OPTION_COMMAND_TTL,
+    OPTION_COMMAND_TTL_DEFAULT,
+    OPTION_EVENT_OVERFLOW,
+    OPTION_EVENT_OVERFLOW_DEFAULT,
+    OPTION_EVENT_QUEUE_SIZE,
+    OPTION_EVENT_QUEUE_SIZE_DEFAULT,
+    OPTION_PROFILING,
+    OPTION_PROFILING_DEFAULT,
+    OPTION_SLOW_THRESHOLD,
+    OPTION_SLOW_THRESHOLD_DEFAULT,
     OPTION_GENERIC_SCENES,
     OPTION_GENERIC_SCENES_DEFAULT,
 )
 from .util import slugify_entry
 
+URL_VERSION = "/json/system/version"
+
+# host to (expiry, reachable port or None) of recently probed servers
+_PROBE_CACHE: Dict[str, Tuple[float, Optional[int]]] = {}
+
 
 @callback
 def configured_devices(hass):
@@ -56,12 +83,48 @@ def initialized_devices(hass):
     return initialized_devices
 
 
+async def probe_port(host: str, port: int) -> bool:
+    """check if a digitalSTROM server answers on the given port"""
+    from pydigitalstrom.exceptions import DSCommandFailedException, DSException
+    from pydigitalstrom.requesthandler import DSRequestHandler
+
+    handler = DSRequestHandler(host=host, port=port)
+    try:
+        await asyncio.wait_for(handler.raw_request(URL_VERSION), timeout=PROBE_TIMEOUT)
+    except DSCommandFailedException:
+        # the server answered, it just wants to be authenticated
+        return True
+    except (DSException, OSError, asyncio.TimeoutError):
+        return False
+    return True
+
+
+async def probe_server(host: str, ports: List[int]) -> Optional[int]:
+    """
+    probe all candidate ports of a host at once
+
+    returns the first reachable port in order of preference, results are
+    cached per host so repeated announcements don't hit the network again
+    """
+    now: float = time.monotonic()
+    if host in _PROBE_CACHE and _PROBE_CACHE[host][0] > now:
+        return _PROBE_CACHE[host][1]
+
+    results: list = await asyncio.gather(
+        *[probe_port(host=host, port=port) for port in ports]
+    )
+    reachable: Optional[int] = next(
+        (port for port, result in zip(ports, results) if result), None
+    )
+    _PROBE_CACHE[host] = (now + PROBE_CACHE_TTL, reachable)
+    return reachable
+
+
 class DigitalStromConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """handle a digitalSTROM config flow"""
 
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_PUSH
-    discovered_devices = []
 
     def __init__(self, *args, **kwargs):
         self.device_config = {
@@ -162,27 +225,37 @@ class DigitalStromConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if discovery_info.get(ATTR_UPNP_MANUFACTURER) not in DIGITALSTROM_MANUFACTURERS:
             return self.async_abort(reason="not_digitalstrom_server")
 
-        # get host from ssdp location
+        # get host and announced port from ssdp location
         parseresult = urlparse(discovery_info.get(ATTR_SSDP_LOCATION))
-        host = str(parseresult.netloc)
-        # cut off the port since it's not the expected one anyway
-        if ":" in host:
-            host, _port = host.split(":")
+        host = str(parseresult.hostname)
 
-        # device already known, filter duplicates
-        device_slug = slugify_entry(host=host, port=DEFAULT_PORT)
+        # filter duplicate announcements of servers being set up
+        await self.async_set_unique_id(slugify_entry(host=host, port=""))
+        self._abort_if_unique_id_configured()
+
+        # the announced port usually isn't the api port, so probe all candidates
+        ports: list = list(PROBE_PORTS)
+        if parseresult.port and parseresult.port not in ports:
+            ports.append(parseresult.port)
+        port: Optional[int] = await probe_server(host=host, ports=ports)
+        if port is None:
+            return self.async_abort(reason="not_reachable")
+
+        # device already known
+        device_slug = slugify_entry(host=host, port=port)
+        if device_slug in configured_devices(self.hass):
+            return self.async_abort(reason="already_configured")
         if device_slug in initialized_devices(self.hass):
             return self.async_abort(reason="already_configured")
 
-        # add to discovered devices
-        if device_slug in self.discovered_devices:
-            return self.async_abort(reason="already_discovered")
-        self.discovered_devices.append(device_slug)
+        self.context["title_placeholders"] = {
+            "name": discovery_info.get(ATTR_UPNP_FRIENDLY_NAME) or host
+        }
 
         # pre-fill schema and let the user complete it
         self.device_config = {
             CONF_HOST: host,
-            CONF_PORT: DEFAULT_PORT,
+            CONF_PORT: port,
             CONF_USERNAME: DEFAULT_USERNAME,
             CONF_PASSWORD: "",
             CONF_ALIAS: discovery_info.get(ATTR_UPNP_FRIENDLY_NAME),
@@ -219,6 +292,48 @@ class DigitalStromOptionsFlow(config_entries.OptionsFlow):
                     OPTION_GENERIC_SCENES, OPTION_GENERIC_SCENES_DEFAULT
                 ),
             ): config_validation.multi_select(scenes),
+            vol.Optional(
+                OPTION_COMMAND_QUEUE,
+                default=self.config_entry.options.get(
+                    OPTION_COMMAND_QUEUE, OPTION_COMMAND_QUEUE_DEFAULT
+                ),
+            ): bool,
+            vol.Optional(
+                OPTION_COMMAND_TTL,
+                default=self.config_entry.options.get(
+                    OPTION_COMMAND_TTL, OPTION_COMMAND_TTL_DEFAULT
+                ),
+            ): int,
+            vol.Optional(
+                OPTION_EVENT_QUEUE_SIZE,
+                default=self.config_entry.options.get(
+                    OPTION_EVENT_QUEUE_SIZE, OPTION_EVENT_QUEUE_SIZE_DEFAULT
+                ),
+            ): vol.All(int, vol.Range(min=1)),
+            vol.Optional(
+                OPTION_EVENT_OVERFLOW,
+                default=self.config_entry.options.get(
+                    OPTION_EVENT_OVERFLOW, OPTION_EVENT_OVERFLOW_DEFAULT
+                ),
+            ): vol.In([EVENT_OVERFLOW_KEEP_LATEST, EVENT_OVERFLOW_DROP_OLDEST]),
+            vol.Optional(
+                OPTION_ACK_TIMEOUT,
+                default=self.config_entry.options.get(
+                    OPTION_ACK_TIMEOUT, OPTION_ACK_TIMEOUT_DEFAULT
+                ),
+            ): vol.All(int, vol.Range(min=1)),
+            vol.Optional(
+                OPTION_PROFILING,
+                default=self.config_entry.options.get(
+                    OPTION_PROFILING, OPTION_PROFILING_DEFAULT
+                ),
+            ): bool,
+            vol.Optional(
+                OPTION_SLOW_THRESHOLD,
+                default=self.config_entry.options.get(
+                    OPTION_SLOW_THRESHOLD, OPTION_SLOW_THRESHOLD_DEFAULT
+                ),
+            ): int,
         }
 
         return self.async_show_form(step_id="init", data_schema=vol.Schema(options))
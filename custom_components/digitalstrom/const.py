@@ -1,5 +1,5 @@
 """Define constants for the digitalSTROM component."""
-from typing import List
+from typing import Dict, List, Tuple
 
 from pydigitalstrom import constants as dsconst
 
@@ -10,14 +10,40 @@ SLUG_FORMAT: str = "{host}_{port}"
 TITLE_FORMAT: str = "{alias} ({host}:{port})"
 
 CONF_DELAY: str = "delay"
+# hash of the zone structure the devices and areas were last registered for
+CONF_STRUCTURE_HASH: str = "structure_hash"
 
 DIGITALSTROM_MANUFACTURERS: List[str] = ["digitalSTROM AG", "aizo ag"]
 DEFAULT_HOST: str = "dss.local"
 DEFAULT_PORT: int = 8080
+# ports a discovered digitalSTROM server is probed on besides the announced one
+PROBE_PORTS: List[int] = [DEFAULT_PORT, 443]
+PROBE_TIMEOUT: int = 3
+PROBE_CACHE_TTL: int = 300
 DEFAULT_DELAY: int = 500
 DEFAULT_USERNAME: str = "dssadmin"
 DEFAULT_ALIAS: str = "Apartment"
 
+OPTION_COMMAND_QUEUE: str = "command_queue"
+OPTION_COMMAND_QUEUE_DEFAULT: bool = False
+OPTION_COMMAND_TTL: str = "command_ttl"
+OPTION_COMMAND_TTL_DEFAULT: int = 300
+
+OPTION_PROFILING: str = "profiling"
+OPTION_PROFILING_DEFAULT: bool = False
+OPTION_SLOW_THRESHOLD: str = "slow_threshold"
+OPTION_SLOW_THRESHOLD_DEFAULT: int = 100
+
+OPTION_EVENT_QUEUE_SIZE: str = "event_queue_size"
+OPTION_EVENT_QUEUE_SIZE_DEFAULT: int = 1000
+OPTION_EVENT_OVERFLOW: str = "event_overflow"
+EVENT_OVERFLOW_KEEP_LATEST: str = "keep_latest"
+EVENT_OVERFLOW_DROP_OLDEST: str = "drop_oldest"
+OPTION_EVENT_OVERFLOW_DEFAULT: str = EVENT_OVERFLOW_KEEP_LATEST
+
+OPTION_ACK_TIMEOUT: str = "ack_timeout"
+OPTION_ACK_TIMEOUT_DEFAULT: int = 5
+
 OPTION_GENERIC_SCENES: str = "generic_scenes"
 OPTION_GENERIC_SCENES_DEFAULT: List[str] = [
     dsconst.SCENE_SLEEPING,
@@ -26,3 +52,78 @@ OPTION_GENERIC_SCENES_DEFAULT: List[str] = [
     dsconst.SCENE_ABSENT,
     dsconst.SCENE_ROOM_WAKEUP,
 ]
+
+METERING_MIN_INTERVAL: int = 10
+METERING_MAX_INTERVAL: int = 300
+METERING_SLOW_RATIO: float = 0.2
+
+EVENT_KEEP_ALIVE: str = "keepWebserviceAlive"
+EVENT_CALL_SCENE: str = "callScene"
+EVENT_ZONE_SENSOR_VALUE: str = "zoneSensorValue"
+EVENT_DEVICE_SENSOR_VALUE: str = "deviceSensorValue"
+EVENT_BUTTON_CLICK: str = "buttonClick"
+SENSOR_EVENTS: List[str] = [EVENT_ZONE_SENSOR_VALUE, EVENT_DEVICE_SENSOR_VALUE]
+# events subscribed on the websocket connection of every server
+LISTENER_EVENTS: List[str] = [EVENT_CALL_SCENE, EVENT_BUTTON_CLICK] + SENSOR_EVENTS
+
+# fired on the home assistant bus for every button click
+BUS_EVENT: str = "digitalstrom_event"
+# digitalSTROM click types exposed as device triggers
+CLICK_TYPES: Dict[int, str] = {
+    0: "tip_1x",
+    1: "tip_2x",
+    2: "tip_3x",
+    3: "tip_4x",
+    4: "hold_start",
+    5: "hold_repeat",
+    6: "hold_end",
+    7: "click_1x",
+    8: "click_2x",
+    9: "click_3x",
+    10: "short_long",
+    13: "short_short_long",
+}
+
+# digitalSTROM sensor type: name, unit, device class, dead band
+SENSOR_TYPES: Dict[int, Tuple[str, str, str, float]] = {
+    9: ("temperature", "°C", "temperature", 0.1),
+    10: ("outdoor temperature", "°C", "temperature", 0.1),
+    11: ("brightness", "lx", "illuminance", 10.0),
+    12: ("outdoor brightness", "lx", "illuminance", 10.0),
+    13: ("humidity", "%", "humidity", 0.5),
+    14: ("outdoor humidity", "%", "humidity", 0.5),
+    21: ("CO2", "ppm", "carbon_dioxide", 10.0),
+}
+# keys of apartment/getSensorValues mapped to sensor types
+SENSOR_VALUE_KEYS: Dict[str, int] = {
+    "TemperatureValue": 9,
+    "BrightnessValue": 11,
+    "HumidityValue": 13,
+    "CO2concentrationValue": 21,
+}
+SENSOR_MIN_INTERVAL: int = 10
+
+COMMAND_RETRY_DELAY: int = 5
+COMMAND_MAX_RETRY_DELAY: int = 60
+STORAGE_VERSION: int = 1
+STORAGE_COMMANDS_FORMAT: str = DOMAIN + ".{slug}.commands"
+SIGNAL_COMMAND_QUEUE: str = DOMAIN + "_command_queue_{slug}"
+
+# unconfirmed scene calls are sent again this often before they are flagged
+ACK_RETRIES: int = 1
+# upper bounds of the command to echo latency histogram (in ms)
+ACK_LATENCY_BUCKETS: List[int] = [50, 100, 250, 500, 1000, 2500, 5000]
+SIGNAL_COMMAND_LATENCY: str = DOMAIN + "_command_latency_{slug}"
+
+SERVICE_SCHEDULE_SCENES: str = "schedule_scenes"
+# requests of a scheduled burst in flight at once
+BURST_CONCURRENCY: int = 3
+# fired once the calls of a scheduled burst are confirmed or given up
+EVENT_SCHEDULE_COMPLETED: str = DOMAIN + "_schedule_completed"
+
+SERVICE_PROFILE: str = "profile"
+PROFILE_DEFAULT_DURATION: int = 60
+PROFILE_FILE_FORMAT: str = DOMAIN + "_profile.{time}.cprof"
+
+COVER_GROUP: int = 2
+COVER_PLAN_WINDOW: float = 0.1
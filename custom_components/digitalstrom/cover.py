@@ -2,16 +2,30 @@
 import logging
 from typing import Callable, Union
 
-from homeassistant.components.cover import CoverEntity, SUPPORT_CLOSE, SUPPORT_OPEN
+from homeassistant.components.cover import (
+    ATTR_POSITION,
+    CoverEntity,
+    SUPPORT_CLOSE,
+    SUPPORT_OPEN,
+    SUPPORT_SET_POSITION,
+    SUPPORT_STOP,
+)
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_PORT
 from homeassistant.helpers.typing import ConfigType, HomeAssistantType
 from pydigitalstrom.client import DSClient
 from pydigitalstrom.devices.scene import DSScene, DSColorScene
-from pydigitalstrom.websocket import DSWebsocketEventListener
 
 from .const import DOMAIN
-from .util import slugify_entry
+from .listener import DSMultiplexEventListener
+from .planner import (
+    ACTION_CLOSE,
+    ACTION_OPEN,
+    ACTION_POSITION,
+    ACTION_STOP,
+    DSCoverPlanner,
+)
+from .util import slugify_entry, zone_device_info
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,7 +46,9 @@ async def async_setup_entry(
     entry_slug: str = slugify_entry(host=entry.data[CONF_HOST], port=entry.data[CONF_PORT])
 
     client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
-    listener: DSWebsocketEventListener = hass.data[DOMAIN][entry_slug]["listener"]
+    listener: DSMultiplexEventListener = hass.data[DOMAIN][entry_slug]["listener"]
+    planner = DSCoverPlanner(hass=hass, client=client)
+    hass.data[DOMAIN][entry_slug]["cover_planner"] = planner
     devices: list = []
     scenes: dict = client.get_scenes()
 
@@ -56,9 +72,15 @@ async def async_setup_entry(
 
         # add cover
         _LOGGER.info(f"adding cover {scene.scene_id}: {scene.name}")
+        planner.register(zone_id=scene.zone_id, area=scene.scene_id)
         devices.append(
             DigitalstromCover(
-                hass=hass, scene_on=scene_on, scene_off=scene, listener=listener
+                hass=hass,
+                entry_slug=entry_slug,
+                scene_on=scene_on,
+                scene_off=scene,
+                listener=listener,
+                planner=planner,
             )
         )
 
@@ -70,23 +92,35 @@ class DigitalstromCover(CoverEntity):
     def __init__(
         self,
         hass: HomeAssistantType,
+        entry_slug: str,
         scene_on: DSColorScene,
         scene_off: DSColorScene,
-        listener: DSWebsocketEventListener,
+        listener: DSMultiplexEventListener,
+        planner: DSCoverPlanner,
         *args,
         **kwargs,
     ):
         self._hass: HomeAssistantType = hass
+        self._entry_slug: str = entry_slug
         self._scene_on: DSColorScene = scene_on
         self._scene_off: DSColorScene = scene_off
-        self._listener: DSWebsocketEventListener = listener
+        self._listener: DSMultiplexEventListener = listener
+        self._planner: DSCoverPlanner = planner
         self._state: bool = None
         super().__init__(*args, **kwargs)
 
     @property
     def supported_features(self) -> int:
         """Flag supported features."""
-        return SUPPORT_OPEN | SUPPORT_CLOSE
+        features: int = SUPPORT_OPEN | SUPPORT_CLOSE | SUPPORT_STOP
+        # output values can only be set for the whole zone
+        if self._area == 0:
+            features |= SUPPORT_SET_POSITION
+        return features
+
+    @property
+    def _area(self) -> int:
+        return self._scene_off.scene_id
 
     @property
     def name(self) -> str:
@@ -104,13 +138,33 @@ class DigitalstromCover(CoverEntity):
     def is_closed(self) -> bool:
         return None
 
+    def scheduled_scene(self, turn_on: bool) -> DSColorScene:
+        """scene called for this entity by the schedule_scenes service"""
+        return self._scene_on if turn_on else self._scene_off
+
     async def async_open_cover(self, **kwargs) -> None:
-        _LOGGER.info(f"calling cover scene {self._scene_on.scene_id}")
-        await self._scene_on.turn_on()
+        await self._planner.async_request(
+            zone_id=self._scene_off.zone_id, area=self._area, action=ACTION_OPEN
+        )
 
     async def async_close_cover(self, **kwargs) -> None:
-        _LOGGER.info(f"calling cover scene {self._scene_off.scene_id}")
-        await self._scene_off.turn_on()
+        await self._planner.async_request(
+            zone_id=self._scene_off.zone_id, area=self._area, action=ACTION_CLOSE
+        )
+
+    async def async_stop_cover(self, **kwargs) -> None:
+        await self._planner.async_request(
+            zone_id=self._scene_off.zone_id, area=self._area, action=ACTION_STOP
+        )
+
+    async def async_set_cover_position(self, **kwargs) -> None:
+        # digitalSTROM output values range from 0 (closed) to 255 (open)
+        await self._planner.async_request(
+            zone_id=self._scene_off.zone_id,
+            area=self._area,
+            action=ACTION_POSITION,
+            value=round(kwargs[ATTR_POSITION] * 255 / 100),
+        )
 
     def should_poll(self) -> bool:
         return False
@@ -118,9 +172,8 @@ class DigitalstromCover(CoverEntity):
     @property
     def device_info(self) -> dict:
         """Return information about the device."""
-        return {
-            "identifiers": {(DOMAIN, self._scene_off.unique_id)},
-            "name": self._scene_off.name,
-            "model": "DSCover",
-            "manufacturer": "digitalSTROM AG",
-        }
+        return zone_device_info(
+            entry_slug=self._entry_slug,
+            zone_id=self._scene_off.zone_id,
+            zone_name=self._scene_off.zone_name,
+        )
@@ -0,0 +1,85 @@
+"""Provides device triggers for digitalSTROM buttons."""
+from typing import List
+
+import voluptuous as vol
+
+from homeassistant.components.automation import AutomationActionType
+from homeassistant.components.device_automation import DEVICE_TRIGGER_BASE_SCHEMA
+from homeassistant.components.homeassistant.triggers import event as event_trigger
+from homeassistant.const import (
+    CONF_DEVICE_ID,
+    CONF_DOMAIN,
+    CONF_PLATFORM,
+    CONF_TYPE,
+)
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.helpers.typing import ConfigType, HomeAssistantType
+
+from .const import BUS_EVENT, CLICK_TYPES, DOMAIN
+
+CONF_SUBTYPE: str = "subtype"
+SUBTYPE_FORMAT: str = "button_{index}"
+
+TRIGGER_SCHEMA = DEVICE_TRIGGER_BASE_SCHEMA.extend(
+    {
+        vol.Required(CONF_TYPE): vol.In(CLICK_TYPES.values()),
+        vol.Required(CONF_SUBTYPE): vol.Match(r"^button_\d+$"),
+    }
+)
+
+
+def button_inputs(hass: HomeAssistantType, device_id: str) -> int:
+    """return the number of button inputs of a device, 0 for unknown devices"""
+    entry_data: dict
+    for entry_data in hass.data.get(DOMAIN, {}).values():
+        button_dispatcher = entry_data.get("button_dispatcher")
+        if button_dispatcher and device_id in button_dispatcher.buttons:
+            return button_dispatcher.buttons[device_id]
+    return 0
+
+
+async def async_get_triggers(hass: HomeAssistantType, device_id: str) -> List[dict]:
+    """List device triggers for digitalSTROM buttons."""
+    triggers: list = []
+
+    index: int
+    for index in range(button_inputs(hass=hass, device_id=device_id)):
+        click_type: str
+        for click_type in CLICK_TYPES.values():
+            triggers.append(
+                {
+                    CONF_PLATFORM: "device",
+                    CONF_DEVICE_ID: device_id,
+                    CONF_DOMAIN: DOMAIN,
+                    CONF_TYPE: click_type,
+                    CONF_SUBTYPE: SUBTYPE_FORMAT.format(index=index),
+                }
+            )
+
+    return triggers
+
+
+async def async_attach_trigger(
+    hass: HomeAssistantType,
+    config: ConfigType,
+    action: AutomationActionType,
+    automation_info: dict,
+) -> CALLBACK_TYPE:
+    """Attach a trigger listening to button events on the bus."""
+    config = TRIGGER_SCHEMA(config)
+    index: int = int(config[CONF_SUBTYPE][len(SUBTYPE_FORMAT.format(index="")) :])
+
+    event_config = event_trigger.TRIGGER_SCHEMA(
+        {
+            event_trigger.CONF_PLATFORM: "event",
+            event_trigger.CONF_EVENT_TYPE: BUS_EVENT,
+            event_trigger.CONF_EVENT_DATA: {
+                CONF_DEVICE_ID: config[CONF_DEVICE_ID],
+                "button_index": index,
+                "click_type": config[CONF_TYPE],
+            },
+        }
+    )
+    return await event_trigger.async_attach_trigger(
+        hass, event_config, action, automation_info, platform_type="device"
+    )
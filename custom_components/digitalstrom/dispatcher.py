@@ -0,0 +1,84 @@
+# -*- coding: UTF-8 -*-
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from homeassistant.helpers.typing import HomeAssistantType
+
+from .const import BUS_EVENT, CLICK_TYPES
+from .events import DSButtonEvent, DSSensorEvent
+from .profiling import DSProfiler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSSensorDispatcher:
+    """
+    route sensor value events to the sensor entities interested in them
+
+    callbacks are indexed by (source, sensor) so each event only reaches
+    its own entity instead of being checked by every sensor, the source is
+    the zone for zone sensors and the dSUID for device sensors
+
+    with a profiler, every entity callback is timed on its own
+    """
+
+    def __init__(self, profiler: DSProfiler = None):
+        self._profiler: DSProfiler = profiler
+        self._callbacks: Dict[Tuple[str, int], List[Callable]] = {}
+        self._unknown_callback: Callable = None
+
+    def register(self, source: str, sensor: int, callback: Callable) -> None:
+        if self._profiler is not None:
+            callback = self._profiler.wrap_callback(callback=callback)
+        self._callbacks.setdefault((source, sensor), []).append(callback)
+
+    def register_unknown(self, callback: Callable) -> None:
+        """called with the event of sensors without any registered entity"""
+        if self._profiler is not None:
+            callback = self._profiler.wrap_callback(callback=callback)
+        self._unknown_callback = callback
+
+    async def handle_event(self, event: DSSensorEvent) -> None:
+        callbacks: List[Callable] = self._callbacks.get((event.source, event.sensor))
+        if callbacks is None:
+            if self._unknown_callback is not None:
+                self._unknown_callback(event)
+            return
+
+        callback: Callable
+        for callback in callbacks:
+            callback(event.value)
+
+
+class DSButtonDispatcher:
+    """
+    fire button clicks on the home assistant bus
+
+    events are fired straight from the listener without touching any
+    entity state, device triggers listen to these bus events
+    """
+
+    def __init__(self, hass: HomeAssistantType):
+        self._hass: HomeAssistantType = hass
+        self._devices: Dict[str, str] = {}
+        # device registry id to number of button inputs
+        self.buttons: Dict[str, int] = {}
+
+    def register(self, dsids: List[str], device_id: str, inputs: int) -> None:
+        dsid: str
+        for dsid in dsids:
+            self._devices[dsid] = device_id
+        self.buttons[device_id] = inputs
+
+    async def handle_event(self, event: DSButtonEvent) -> None:
+        self._hass.bus.async_fire(
+            BUS_EVENT,
+            {
+                "device_id": self._devices.get(event.dsid),
+                "dsid": event.dsid,
+                "zone_id": event.zone_id,
+                "button_index": event.button_index,
+                "click_type": CLICK_TYPES.get(event.click_type, str(event.click_type)),
+                "hold_count": event.hold_count,
+            },
+        )
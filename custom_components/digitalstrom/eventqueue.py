@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from .const import EVENT_OVERFLOW_KEEP_LATEST
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSEventQueue:
+    """
+    bounded queue between the websocket and the event handlers
+
+    with the keep latest policy an event replaces a queued event with the
+    same key, e.g. the same zone, group and area, so bursts collapse into
+    their final state. once the queue is full the oldest event is dropped
+    """
+
+    def __init__(self, capacity: int, policy: str = EVENT_OVERFLOW_KEEP_LATEST):
+        self._capacity: int = capacity
+        self._coalesce: bool = policy == EVENT_OVERFLOW_KEEP_LATEST
+        self._events: OrderedDict = OrderedDict()
+        self._available = asyncio.Event()
+        self._sequence = itertools.count()
+
+        self.high_water: int = 0
+        self.superseded: int = 0
+        self.overflowed: int = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._events)
+
+    @property
+    def dropped(self) -> int:
+        return self.superseded + self.overflowed
+
+    def put(self, key: Optional[Hashable], item: Tuple) -> None:
+        if key is not None and self._coalesce and key in self._events:
+            del self._events[key]
+            self.superseded += 1
+        elif len(self._events) >= self._capacity:
+            self._events.popitem(last=False)
+            self.overflowed += 1
+            if self.overflowed == 1 or self.overflowed % self._capacity == 0:
+                _LOGGER.warning(
+                    f"event queue full, dropped {self.overflowed} events so far"
+                )
+
+        # events that never supersede others get a key of their own
+        if key is None or not self._coalesce:
+            key = next(self._sequence)
+        self._events[key] = item
+
+        if len(self._events) > self.high_water:
+            self.high_water = len(self._events)
+        self._available.set()
+
+    async def get(self) -> Tuple:
+        while not self._events:
+            self._available.clear()
+            await self._available.wait()
+        return self._events.popitem(last=False)[1]
@@ -0,0 +1,135 @@
+# -*- coding: UTF-8 -*-
+from typing import Callable, Dict, Hashable, NamedTuple, Optional
+
+from .const import (
+    EVENT_BUTTON_CLICK,
+    EVENT_CALL_SCENE,
+    EVENT_DEVICE_SENSOR_VALUE,
+    EVENT_KEEP_ALIVE,
+    EVENT_ZONE_SENSOR_VALUE,
+)
+from .util import scene_area
+
+
+class DSSceneEvent(NamedTuple):
+    zone_id: int
+    group_id: int
+    scene_id: int
+
+
+class DSSensorEvent(NamedTuple):
+    # zone for zone sensors, dSUID for device sensors
+    source: str
+    # sensor type for zone sensors, input index for device sensors
+    sensor: int
+    sensor_type: int
+    zone_id: int
+    value: float
+
+
+class DSButtonEvent(NamedTuple):
+    dsid: str
+    zone_id: int
+    button_index: int
+    click_type: int
+    hold_count: int
+
+
+def zone_source(zone_id: int) -> str:
+    return f"zone{zone_id}"
+
+
+# parsers raise AttributeError, KeyError, TypeError or ValueError on malformed events
+
+
+def parse_keep_alive(event: dict) -> None:
+    return None
+
+
+def parse_call_scene(event: dict) -> DSSceneEvent:
+    properties: dict = event["properties"]
+    return DSSceneEvent(
+        zone_id=int(properties["zoneID"]),
+        group_id=int(properties.get("groupID", 0)),
+        scene_id=int(properties["sceneID"]),
+    )
+
+
+def _sensor_value(properties: dict) -> float:
+    return float(properties.get("sensorValueFloat", properties.get("sensorValue")))
+
+
+def parse_zone_sensor_value(event: dict) -> DSSensorEvent:
+    properties: dict = event["properties"]
+    zone_id: int = int(properties["zoneID"])
+    sensor_type: int = int(properties["sensorType"])
+    return DSSensorEvent(
+        source=zone_source(zone_id=zone_id),
+        sensor=sensor_type,
+        sensor_type=sensor_type,
+        zone_id=zone_id,
+        value=_sensor_value(properties=properties),
+    )
+
+
+def parse_device_sensor_value(event: dict) -> DSSensorEvent:
+    properties: dict = event["properties"]
+    device: dict = event["source"]
+    source: str = device.get("dSUID", device.get("dsid"))
+    if not source:
+        raise KeyError("dSUID")
+    return DSSensorEvent(
+        source=source,
+        sensor=int(properties["sensorIndex"]),
+        sensor_type=int(properties["sensorType"]),
+        zone_id=int(device.get("zoneID", 0)),
+        value=_sensor_value(properties=properties),
+    )
+
+
+def parse_button_click(event: dict) -> DSButtonEvent:
+    properties: dict = event["properties"]
+    device: dict = event["source"]
+    dsid: str = device.get("dSUID", device.get("dsid"))
+    if not dsid:
+        raise KeyError("dSUID")
+    return DSButtonEvent(
+        dsid=dsid,
+        zone_id=int(device.get("zoneID", 0)),
+        button_index=int(properties.get("buttonIndex", 0)),
+        click_type=int(properties["clickType"]),
+        hold_count=int(properties.get("holdCount", 0)),
+    )
+
+
+PARSERS: Dict[str, Callable] = {
+    EVENT_KEEP_ALIVE: parse_keep_alive,
+    EVENT_CALL_SCENE: parse_call_scene,
+    EVENT_ZONE_SENSOR_VALUE: parse_zone_sensor_value,
+    EVENT_DEVICE_SENSOR_VALUE: parse_device_sensor_value,
+    EVENT_BUTTON_CLICK: parse_button_click,
+}
+
+
+# events with the same key supersede each other, events without a key never do
+
+
+def scene_key(event: DSSceneEvent) -> Hashable:
+    return event.zone_id, event.group_id, scene_area(scene_id=event.scene_id)
+
+
+def sensor_key(event: DSSensorEvent) -> Hashable:
+    return event.source, event.sensor
+
+
+def no_key(event) -> Optional[Hashable]:
+    return None
+
+
+KEYS: Dict[str, Callable] = {
+    EVENT_KEEP_ALIVE: no_key,
+    EVENT_CALL_SCENE: scene_key,
+    EVENT_ZONE_SENSOR_VALUE: sensor_key,
+    EVENT_DEVICE_SENSOR_VALUE: sensor_key,
+    EVENT_BUTTON_CLICK: no_key,
+}
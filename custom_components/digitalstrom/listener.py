@@ -0,0 +1,159 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+import json
+import logging
+import time
+from typing import Callable, Dict, Iterable, Tuple
+
+import aiohttp
+from pydigitalstrom.client import DSClient
+from pydigitalstrom.websocket import DSWebsocketEventListener
+
+from .const import (
+    EVENT_CALL_SCENE,
+    EVENT_KEEP_ALIVE,
+    EVENT_OVERFLOW_KEEP_LATEST,
+    OPTION_EVENT_QUEUE_SIZE_DEFAULT,
+)
+from .eventqueue import DSEventQueue
+from .events import KEYS, PARSERS
+from .profiling import DSProfiler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSMultiplexEventListener(DSWebsocketEventListener):
+    """
+    one websocket connection per digitalSTROM server for a set of events
+
+    handlers are kept in a table of tuples per event name that is built
+    on registration, so a frame costs a single lookup of its name and no
+    comparison against every subscribed event or handler
+
+    every frame is parsed into a typed event record exactly once before
+    it reaches the handlers, malformed frames are counted and dropped
+
+    parsed events wait in a bounded queue for the handlers, so a burst
+    can't pile up work on the event loop, see DSEventQueue. observers are
+    called synchronously before that and see every event, including the
+    ones superseded in the queue
+
+    with a profiler, every handler and observer is timed on its own
+    """
+
+    def __init__(
+        self,
+        client: DSClient,
+        event_names: Iterable[str],
+        profiler: DSProfiler = None,
+        queue_size: int = OPTION_EVENT_QUEUE_SIZE_DEFAULT,
+        overflow: str = EVENT_OVERFLOW_KEEP_LATEST,
+    ):
+        super().__init__(client=client, event_name=None)
+        self._profiler: DSProfiler = profiler
+        # event name to (parser, key, handlers, observers)
+        self._handlers: Dict[
+            str, Tuple[Callable, Callable, Tuple[Callable, ...], Tuple[Callable, ...]]
+        ] = {
+            event_name: (PARSERS[event_name], KEYS[event_name], (), ())
+            for event_name in event_names
+        }
+        self._handlers[EVENT_KEEP_ALIVE] = (
+            PARSERS[EVENT_KEEP_ALIVE],
+            KEYS[EVENT_KEEP_ALIVE],
+            (self._keep_alive,),
+            (),
+        )
+        self.rejected: int = 0
+        self.queue = DSEventQueue(capacity=queue_size, policy=overflow)
+        self._consumer: asyncio.Task = None
+
+    def register(self, callback: Callable, event_name: str = EVENT_CALL_SCENE) -> None:
+        if event_name not in self._handlers:
+            raise ValueError(f"not subscribed to {event_name} events")
+        if self._profiler is not None:
+            callback = self._profiler.wrap_handler(handler=callback)
+        parser, key, handlers, observers = self._handlers[event_name]
+        self._handlers[event_name] = (parser, key, handlers + (callback,), observers)
+
+    def observe(self, callback: Callable, event_name: str = EVENT_CALL_SCENE) -> None:
+        """call a synchronous callback with every event before it is queued"""
+        if event_name not in self._handlers:
+            raise ValueError(f"not subscribed to {event_name} events")
+        if self._profiler is not None:
+            callback = self._profiler.wrap_callback(callback=callback)
+        parser, key, handlers, observers = self._handlers[event_name]
+        self._handlers[event_name] = (parser, key, handlers, observers + (callback,))
+
+    async def start(self) -> None:
+        if self._consumer is None:
+            self._consumer = asyncio.ensure_future(self._consume())
+
+        session: aiohttp.ClientSession = await self._client.get_aiohttp_session(
+            cookies=await self._get_cookie()
+        )
+        url: str = f"wss://{self._client.host}:{self._client.port}/websocket"
+        async with session, session.ws_connect(url=url) as ws:
+            self._ws = ws
+            msg: aiohttp.WSMessage
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    await self._receive(data=msg.data)
+                else:
+                    _LOGGER.warning(f"unexpected websocket message {msg}")
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+
+    async def _keep_alive(self, event: None) -> None:
+        self._last_keepalive = time.time() * 1000.0
+
+    async def _receive(self, data: str) -> None:
+        try:
+            event = json.loads(data)
+        except ValueError:
+            self.rejected += 1
+            _LOGGER.debug(f"rejected malformed frame {data}")
+            return
+        await self._handle_event(event=event)
+
+    async def _handle_event(self, event: dict) -> None:
+        if not isinstance(event, dict) or not isinstance(event.get("name", ""), str):
+            self.rejected += 1
+            _LOGGER.debug(f"rejected malformed event {event}")
+            return
+
+        entry: tuple = self._handlers.get(event.get("name"))
+        if entry is None:
+            return
+        parser, key, handlers, observers = entry
+
+        try:
+            record = parser(event)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self.rejected += 1
+            _LOGGER.debug(f"rejected malformed event {event}")
+            return
+
+        observer: Callable
+        for observer in observers:
+            try:
+                observer(event=record)
+            except Exception:
+                _LOGGER.exception(f"error observing event {record}")
+
+        self.queue.put(key=key(record), item=(handlers, record))
+
+    async def _consume(self) -> None:
+        while True:
+            handlers, record = await self.queue.get()
+
+            handler: Callable
+            for handler in handlers:
+                try:
+                    await handler(event=record)
+                except Exception:
+                    _LOGGER.exception(f"error handling event {record}")
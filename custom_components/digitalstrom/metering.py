@@ -0,0 +1,108 @@
+# -*- coding: UTF-8 -*-
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.helpers.typing import HomeAssistantType
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from pydigitalstrom.client import DSClient
+from pydigitalstrom.exceptions import DSException
+
+from .const import (
+    DOMAIN,
+    METERING_MIN_INTERVAL,
+    METERING_MAX_INTERVAL,
+    METERING_SLOW_RATIO,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSMeteringCoordinator(DataUpdateCoordinator):
+    """
+    poll power and energy of all dSMs with a single property query
+
+    the polling interval adapts to the load of the digitalSTROM server,
+    it backs off on slow or failed requests and while commands are queued
+    and recovers step by step once the server answers quickly again
+    """
+
+    URL_METERS = (
+        "/json/property/query2?query=/apartment/dSMeters/"
+        "*(dSUID,name,powerConsumption,energyMeterValue)"
+    )
+
+    def __init__(self, hass: HomeAssistantType, client: DSClient):
+        self._client: DSClient = client
+        # every meter reported so far, to spot meters missing from a response
+        self._known: set = set()
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} metering {client.host}",
+            update_method=self._fetch_meters,
+            update_interval=timedelta(seconds=METERING_MIN_INTERVAL),
+        )
+
+    async def _fetch_meters(self) -> dict:
+        started: float = time.monotonic()
+        try:
+            response: dict = await self._client.request(url=self.URL_METERS)
+        except (DSException, RuntimeError, ConnectionResetError) as exc:
+            self._adapt_interval(failed=True)
+            raise UpdateFailed(f"failed to fetch meter values: {exc}")
+        self._adapt_interval(duration=time.monotonic() - started)
+
+        if "result" not in response:
+            raise UpdateFailed("no result in server response")
+
+        meters: dict = {}
+        meter: dict
+        for meter in response["result"].values():
+            # skip nodes that are not meters
+            if not isinstance(meter, dict) or "dSUID" not in meter:
+                continue
+            meters[meter["dSUID"]] = meter
+        self._known.update(meters)
+        return meters
+
+    def _adapt_interval(self, duration: float = 0.0, failed: bool = False) -> None:
+        current: float = self.update_interval.total_seconds()
+
+        # back off if the server is struggling or busy working off commands
+        if (
+            failed
+            or duration > current * METERING_SLOW_RATIO
+            or self._client.stack.depth > 0
+        ):
+            interval: float = min(current * 2, METERING_MAX_INTERVAL)
+        # otherwise slowly recover
+        else:
+            interval = max(current / 2, METERING_MIN_INTERVAL)
+
+        if interval != current:
+            _LOGGER.debug(f"metering interval for {self._client.host} set to {interval}s")
+            self.update_interval = timedelta(seconds=interval)
+
+    def power(self, dsuid: str = None) -> float:
+        """current power in W of a single meter or of the whole apartment"""
+        return self._sum(key="powerConsumption", dsuid=dsuid)
+
+    def energy(self, dsuid: str = None) -> float:
+        """energy counter in kWh of a single meter or of the whole apartment"""
+        value: float = self._sum(key="energyMeterValue", dsuid=dsuid)
+        if value is None:
+            return None
+        return round(value / 1000, 3)
+
+    def _sum(self, key: str, dsuid: str = None):
+        if not self.data:
+            return None
+
+        dsuids: set = self._known if dsuid is None else {dsuid}
+
+        # a partial sum would look like a meter reset to the statistics
+        values: list = [self.data.get(meter, {}).get(key) for meter in dsuids]
+        if not values or None in values:
+            return None
+        return sum(values)
@@ -0,0 +1,108 @@
+# -*- coding: UTF-8 -*-
+import logging
+from typing import Dict, List, Set, Tuple
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import HomeAssistantType
+from pydigitalstrom.client import DSClient
+from pydigitalstrom.devices.scene import DSColorScene
+
+from .const import COVER_GROUP, COVER_PLAN_WINDOW
+
+_LOGGER = logging.getLogger(__name__)
+
+ACTION_OPEN: str = "open"
+ACTION_CLOSE: str = "close"
+ACTION_STOP: str = "stop"
+ACTION_POSITION: str = "position"
+
+URL_SET_VALUE = "/json/zone/setValue?id={zone_id}&groupID={color}&value={value}"
+
+
+def cover_scene(action: str, area: int) -> int:
+    """scene of a cover action, area 0 is the whole zone"""
+    if action == ACTION_OPEN:
+        return area + 5
+    if action == ACTION_CLOSE:
+        return area
+    # area stop scenes are 52-55, the zone wide stop is 15
+    if area:
+        return area + 51
+    return 15
+
+
+class DSCoverPlanner:
+    """
+    collect cover commands for a moment and send them as few calls as possible
+
+    a newer command for a cover replaces its pending one, so a move followed
+    by a stop never reaches the bus. the same goes for moves and stops that
+    already wait in the command stack. if every area of a zone moves the same
+    way, a single zone wide scene is called instead of one per area
+    """
+
+    def __init__(self, hass: HomeAssistantType, client: DSClient):
+        self._hass: HomeAssistantType = hass
+        self._client: DSClient = client
+        # areas with a cover per zone
+        self._areas: Dict[int, Set[int]] = {}
+        # (zone, area) to (action, value) of commands waiting to be sent
+        self._pending: Dict[Tuple[int, int], Tuple[str, int]] = {}
+        self._unsub_flush = None
+
+    def register(self, zone_id: int, area: int) -> None:
+        self._areas.setdefault(zone_id, set()).add(area)
+
+    async def async_request(
+        self, zone_id: int, area: int, action: str, value: int = None
+    ) -> None:
+        self._pending[(zone_id, area)] = (action, value)
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass, COVER_PLAN_WINDOW, self._async_flush
+            )
+
+    async def _async_flush(self, _now) -> None:
+        self._unsub_flush = None
+        pending: Dict[Tuple[int, int], Tuple[str, int]] = self._pending
+        self._pending = {}
+
+        # group commands by zone and direction
+        groups: Dict[Tuple[int, str, int], List[int]] = {}
+        for (zone_id, area), (action, value) in pending.items():
+            groups.setdefault((zone_id, action, value), []).append(area)
+
+        for (zone_id, action, value), areas in groups.items():
+            if action == ACTION_POSITION:
+                await self._client.stack.append(
+                    url=URL_SET_VALUE.format(
+                        zone_id=zone_id, color=COVER_GROUP, value=value
+                    )
+                )
+                continue
+
+            # every area of the zone moves the same way
+            zone_areas: Set[int] = self._areas.get(zone_id, set()) - {0}
+            if 0 in areas or (len(zone_areas) > 1 and set(areas) >= zone_areas):
+                areas = [0]
+
+            for area in sorted(areas):
+                _LOGGER.info(f"calling cover {action} in zone {zone_id} area {area}")
+                url: str = DSColorScene.URL_TURN_ON.format(
+                    zone_id=zone_id,
+                    color=COVER_GROUP,
+                    scene_id=cover_scene(action=action, area=area),
+                )
+                # moves and stops of the area still waiting are superseded
+                if self._client.stack.discard(url=url):
+                    _LOGGER.debug(
+                        f"dropped queued cover commands in zone {zone_id} area {area}"
+                    )
+                await self._client.stack.append(url=url)
+
+    @callback
+    def async_cancel(self) -> None:
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
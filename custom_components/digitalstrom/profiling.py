@@ -0,0 +1,133 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+import cProfile
+import functools
+import logging
+import time
+from typing import Awaitable, Callable
+
+from homeassistant.core import ServiceCall
+from homeassistant.helpers.typing import HomeAssistantType
+
+from .const import DOMAIN, PROFILE_FILE_FORMAT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSProfiler:
+    """
+    time event handlers, callbacks and requests and warn about slow ones
+
+    handlers and callbacks run on the event loop, so a slow one blocks every
+    other integration until it returns. only the time a handler actually
+    runs counts, not the time it waits for something it awaits. requests are
+    awaited and only delay the command stack or the entity waiting for them
+    """
+
+    def __init__(self, host: str, threshold: int):
+        self._host: str = host
+        # threshold in seconds
+        self._threshold: float = threshold / 1000
+
+    def wrap_handler(self, handler: Callable) -> Callable:
+        name: str = getattr(handler, "__qualname__", repr(handler))
+
+        @functools.wraps(handler)
+        async def timed_handler(*args, **kwargs):
+            steps = _LoopTime(awaitable=handler(*args, **kwargs))
+            try:
+                return await steps
+            finally:
+                self._report(
+                    message=f"{name} blocked the event loop", elapsed=steps.elapsed
+                )
+
+        return timed_handler
+
+    def wrap_callback(self, callback: Callable) -> Callable:
+        name: str = getattr(callback, "__qualname__", repr(callback))
+
+        @functools.wraps(callback)
+        def timed_callback(*args, **kwargs):
+            started: float = time.perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                self._check(message=f"{name} blocked the event loop", started=started)
+
+        return timed_callback
+
+    def wrap_request(self, request: Callable) -> Callable:
+        @functools.wraps(request)
+        async def timed_request(url: str, **kwargs):
+            started: float = time.perf_counter()
+            try:
+                return await request(url=url, **kwargs)
+            finally:
+                self._check(message=f"request {url} took", started=started)
+
+        return timed_request
+
+    def _check(self, message: str, started: float) -> None:
+        self._report(message=message, elapsed=time.perf_counter() - started)
+
+    def _report(self, message: str, elapsed: float) -> None:
+        if elapsed > self._threshold:
+            _LOGGER.warning(
+                f"{message} {elapsed * 1000:.0f}ms on digitalSTROM server at {self._host}"
+            )
+
+
+class _LoopTime:
+    """
+    await a coroutine and add up the time its steps run on the event loop
+
+    every resumption of the coroutine is timed until it suspends again, the
+    time it is suspended in between is left out
+    """
+
+    def __init__(self, awaitable: Awaitable):
+        self._awaitable: Awaitable = awaitable
+        # seconds
+        self.elapsed: float = 0.0
+
+    def __await__(self):
+        steps = self._awaitable.__await__()
+        resume: Callable = steps.send
+        value = None
+        while True:
+            started: float = time.perf_counter()
+            try:
+                suspended = resume(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.elapsed += time.perf_counter() - started
+
+            try:
+                value = yield suspended
+                resume = steps.send
+            except GeneratorExit:
+                steps.close()
+                raise
+            except BaseException as exc:
+                # e.g. a cancellation, hand it to the coroutine
+                value = exc
+                resume = steps.throw
+
+
+async def async_profile(hass: HomeAssistantType, call: ServiceCall) -> None:
+    """profile the event loop for a while and write the stats to the config dir"""
+    duration: int = call.data["duration"]
+    path: str = hass.config.path(PROFILE_FILE_FORMAT.format(time=int(time.time())))
+
+    profiler = cProfile.Profile()
+    _LOGGER.info(f"{DOMAIN} profiling started for {duration}s")
+    profiler.enable()
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        profiler.disable()
+
+    await hass.async_add_executor_job(profiler.dump_stats, path)
+    _LOGGER.info(f"{DOMAIN} profile written to {path}")
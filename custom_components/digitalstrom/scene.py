@@ -11,7 +11,7 @@ from pydigitalstrom.client import DSClient
 from pydigitalstrom.devices.scene import DSScene, DSColorScene
 
 from .const import DOMAIN, OPTION_GENERIC_SCENES, OPTION_GENERIC_SCENES_DEFAULT
-from .util import slugify_entry
+from .util import slugify_entry, zone_device_info
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,7 +47,9 @@ async def async_setup_entry(
                 continue
 
         _LOGGER.info(f"adding scene {scene.scene_id}: {scene.name}")
-        scenes.append(DigitalstromScene(scene=scene, config_entry=entry))
+        scenes.append(
+            DigitalstromScene(scene=scene, config_entry=entry, entry_slug=entry_slug)
+        )
 
     scene: DigitalstromScene
     async_add_entities(scene for scene in scenes)
@@ -60,11 +62,13 @@ class DigitalstromScene(Scene):
         self,
         scene: Union[DSScene, DSColorScene],
         config_entry: ConfigEntry,
+        entry_slug: str,
         *args,
         **kwargs,
     ):
         self._scene: Union[DSScene, DSColorScene] = scene
         self._config_entry: ConfigEntry = config_entry
+        self._entry_slug: str = entry_slug
         super().__init__(*args, **kwargs)
 
     @property
@@ -85,12 +89,11 @@ class DigitalstromScene(Scene):
     @property
     def device_info(self) -> dict:
         """Return information about the device."""
-        return {
-            "identifiers": {(DOMAIN, self._scene.unique_id)},
-            "name": self._scene.name,
-            "model": "DSScene",
-            "manufacturer": "digitalSTROM AG",
-        }
+        return zone_device_info(
+            entry_slug=self._entry_slug,
+            zone_id=self._scene.zone_id,
+            zone_name=self._scene.zone_name,
+        )
 
     @property
     def hidden(self) -> bool:
@@ -0,0 +1,244 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+import datetime
+import functools
+import logging
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import ServiceCall, callback, split_entity_id
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.helpers.typing import HomeAssistantType
+from homeassistant.util import dt as dt_util
+from pydigitalstrom.client import DSClient
+from pydigitalstrom.devices.scene import DSScene, DSColorScene
+from pydigitalstrom.exceptions import DSException
+
+from .const import BURST_CONCURRENCY, DOMAIN, EVENT_SCHEDULE_COMPLETED
+from .tracker import DSCommandTracker
+from .util import scene_call
+
+_LOGGER = logging.getLogger(__name__)
+
+ACTION_ON: str = "on"
+ACTION_OFF: str = "off"
+
+URL_APARTMENT_SCENE = (
+    "/json/apartment/callScene?sceneNumber={scene_id}&groupID={color}&force=true"
+)
+
+
+def plan_scene_calls(
+    scenes: dict, calls: Iterable[Union[DSScene, DSColorScene]]
+) -> List[str]:
+    """
+    turn the scene calls of many entities into as few calls as possible
+
+    if every area of a zone is called the same way, the zone wide scene is
+    called instead. if that is the case for every zone of a group, a single
+    apartment scene is called. the zone wide scenes of zone 0 are called as
+    apartment scenes, calls of the same scene are only planned once
+    """
+    # areas with an on and off scene per zone and group, zones per group
+    areas: Dict[Tuple[int, int], Set[int]] = {}
+    zones: Dict[int, Set[int]] = {}
+    scene: Union[DSScene, DSColorScene]
+    for scene in scenes.values():
+        if not isinstance(scene, DSColorScene) or scene.zone_id == 0 or scene.scene_id > 4:
+            continue
+        zones.setdefault(scene.color, set()).add(scene.zone_id)
+        if scene.scene_id and f"{scene.zone_id}_{scene.color}_{scene.scene_id + 5}" in scenes:
+            areas.setdefault((scene.zone_id, scene.color), set()).add(scene.scene_id)
+
+    # urls in call order per (zone, group, scene), the apartment scene and
+    # zone 0 share one
+    urls: Dict[Tuple[int, int, int], str] = {}
+
+    def plan(url: str) -> None:
+        urls.setdefault(scene_call(url=url), url)
+
+    # (group, turn on) to zone to called areas
+    requested: Dict[Tuple[int, bool], Dict[int, Set[int]]] = {}
+    for scene in calls:
+        if not isinstance(scene, DSColorScene):
+            plan(DSScene.URL_TURN_ON.format(zone_id=scene.zone_id, scene_id=scene.scene_id))
+        elif scene.zone_id == 0 and scene.scene_id in (0, 5):
+            plan(URL_APARTMENT_SCENE.format(scene_id=scene.scene_id, color=scene.color))
+        elif scene.zone_id == 0 or scene.scene_id > 9:
+            plan(
+                DSColorScene.URL_TURN_ON.format(
+                    zone_id=scene.zone_id, color=scene.color, scene_id=scene.scene_id
+                )
+            )
+        else:
+            requested.setdefault((scene.color, scene.scene_id > 4), {}).setdefault(
+                scene.zone_id, set()
+            ).add(scene.scene_id % 5)
+
+    for (color, turn_on), zone_areas in requested.items():
+        offset: int = 5 if turn_on else 0
+        whole: Set[int] = {
+            zone_id
+            for zone_id, called in zone_areas.items()
+            if 0 in called
+            or (
+                len(areas.get((zone_id, color), ())) > 1
+                and called >= areas[(zone_id, color)]
+            )
+        }
+        if len(zones.get(color, ())) > 1 and whole >= zones[color]:
+            plan(URL_APARTMENT_SCENE.format(scene_id=offset, color=color))
+            continue
+
+        for zone_id, called in sorted(zone_areas.items()):
+            area: int
+            for area in [0] if zone_id in whole else sorted(called):
+                plan(
+                    DSColorScene.URL_TURN_ON.format(
+                        zone_id=zone_id, color=color, scene_id=area + offset
+                    )
+                )
+
+    return list(urls.values())
+
+
+def scheduled_time(at: Union[datetime.datetime, datetime.time, None]) -> datetime.datetime:
+    """utc time of the next occurrence of a local time or date and time"""
+    now: datetime.datetime = dt_util.utcnow()
+    if at is None:
+        return now
+    if isinstance(at, datetime.time):
+        scheduled: datetime.datetime = dt_util.now().replace(
+            hour=at.hour, minute=at.minute, second=at.second, microsecond=0
+        )
+        if scheduled < now:
+            scheduled += datetime.timedelta(days=1)
+        return dt_util.as_utc(scheduled)
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    return dt_util.as_utc(at)
+
+
+async def async_schedule_scenes(hass: HomeAssistantType, call: ServiceCall) -> None:
+    """call the scenes of lights, switches and covers in one burst at a given time"""
+    turn_on: bool = call.data["action"] == ACTION_ON
+
+    # scenes per digitalSTROM server
+    calls: Dict[str, list] = {}
+    entity_id: str
+    for entity_id in call.data[ATTR_ENTITY_ID]:
+        component = hass.data.get(split_entity_id(entity_id)[0])
+        entity = component.get_entity(entity_id) if component is not None else None
+        if not hasattr(entity, "scheduled_scene"):
+            _LOGGER.warning(f"{entity_id} is no digitalSTROM light, switch or cover")
+            continue
+
+        scene: Union[DSScene, DSColorScene] = entity.scheduled_scene(turn_on=turn_on)
+        for entry_slug, entry_data in hass.data.get(DOMAIN, {}).items():
+            if entry_data["client"].get_scenes().get(scene.unique_id) is scene:
+                calls.setdefault(entry_slug, []).append(scene)
+                break
+
+    # plan now, so the calls go out without delay at the scheduled time
+    scheduled: datetime.datetime = scheduled_time(at=call.data.get("at"))
+    for entry_slug, scenes in calls.items():
+        client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
+        urls: List[str] = plan_scene_calls(scenes=client.get_scenes(), calls=scenes)
+        _LOGGER.info(
+            f"scheduled {len(urls)} calls for {len(scenes)} scenes on "
+            f"{client.host} at {scheduled.isoformat()}"
+        )
+        async_track_point_in_utc_time(
+            hass,
+            functools.partial(
+                async_dispatch_burst, hass, entry_slug, urls, len(scenes), scheduled
+            ),
+            scheduled,
+        )
+
+
+async def async_dispatch_burst(
+    hass: HomeAssistantType,
+    entry_slug: str,
+    urls: List[str],
+    scenes: int,
+    scheduled: datetime.datetime,
+    _now: datetime.datetime,
+) -> None:
+    """
+    send planned calls at once, bypassing the pacing of the command stack,
+    with a few requests in flight at a time
+
+    completion is reported on the event bus once every call is confirmed
+    by its echo or given up, along with the completion expected from the
+    mean command latency and the one of sending the scenes through the stack
+    """
+    client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
+    tracker: DSCommandTracker = hass.data[DOMAIN][entry_slug]["tracker"]
+
+    started: datetime.datetime = dt_util.utcnow()
+    expected: datetime.datetime = started + datetime.timedelta(
+        milliseconds=tracker.mean_latency or 0
+    )
+    paced: datetime.datetime = started + datetime.timedelta(
+        milliseconds=client.stack.delay * scenes
+    )
+    # watchers are kept per scene call, so count calls of the same scene once
+    keys: Set[Tuple[int, int, int]] = {scene_call(url=url) for url in urls}
+    remaining: int = len(keys)
+    unconfirmed: int = 0
+
+    @callback
+    def done(confirmed: bool) -> None:
+        nonlocal remaining, unconfirmed
+        remaining -= 1
+        if not confirmed:
+            unconfirmed += 1
+        if remaining:
+            return
+
+        completed: datetime.datetime = dt_util.utcnow()
+        _LOGGER.info(
+            f"scheduled scenes on {client.host} completed after "
+            f"{(completed - started).total_seconds():.1f}s, "
+            f"{(completed - expected).total_seconds():+.1f}s from expected"
+        )
+        hass.bus.async_fire(
+            EVENT_SCHEDULE_COMPLETED,
+            {
+                "host": client.host,
+                "scheduled": scheduled.isoformat(),
+                "started": started.isoformat(),
+                "expected": expected.isoformat(),
+                "completed": completed.isoformat(),
+                "paced": paced.isoformat(),
+                "scenes": scenes,
+                "calls": len(urls),
+                "unconfirmed": unconfirmed,
+            },
+        )
+
+    if not urls:
+        return
+
+    key: Tuple[int, int, int]
+    for key in keys:
+        tracker.watch(*key, callback=done)
+
+    semaphore = asyncio.Semaphore(BURST_CONCURRENCY)
+
+    async def send(url: str) -> None:
+        async with semaphore:
+            tracker.sending(url=url)
+            try:
+                await client.request(url=url)
+            except (DSException, RuntimeError, OSError, asyncio.TimeoutError) as exc:
+                _LOGGER.error(f"failed to send {url} to {client.host}: {exc}")
+                tracker.failed(url=url)
+                return
+        tracker.sent(url=url)
+
+    # the first call refreshes a stale session token, so the others reuse it
+    # instead of logging in concurrently
+    await send(url=urls[0])
+    await asyncio.gather(*(send(url=url) for url in urls[1:]))
@@ -0,0 +1,650 @@
+# -*- coding: UTF-8 -*-
+import logging
+import time
+from datetime import timedelta
+from typing import Callable
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    STATE_CLASS_MEASUREMENT,
+    STATE_CLASS_TOTAL_INCREASING,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    CONF_ALIAS,
+    CONF_HOST,
+    CONF_PORT,
+    DEVICE_CLASS_ENERGY,
+    DEVICE_CLASS_POWER,
+    ENERGY_KILO_WATT_HOUR,
+    ENTITY_CATEGORY_DIAGNOSTIC,
+    POWER_WATT,
+    TIME_MILLISECONDS,
+)
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import ConfigType, HomeAssistantType
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from pydigitalstrom.client import DSClient
+from pydigitalstrom.exceptions import DSException
+
+from .commandstack import DSCommandQueue
+from .const import (
+    DOMAIN,
+    SENSOR_MIN_INTERVAL,
+    SENSOR_TYPES,
+    SENSOR_VALUE_KEYS,
+    SIGNAL_COMMAND_LATENCY,
+    SIGNAL_COMMAND_QUEUE,
+)
+from .dispatcher import DSSensorDispatcher
+from .events import DSSensorEvent, zone_source
+from .listener import DSMultiplexEventListener
+from .metering import DSMeteringCoordinator
+from .tracker import DSCommandTracker
+from .util import slugify_entry, zone_device_info
+
+_LOGGER = logging.getLogger(__name__)
+
+URL_SENSOR_VALUES = "/json/apartment/getSensorValues"
+
+# only the event queue metrics are polled
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+async def async_setup_platform(
+    hass: HomeAssistantType,
+    config: ConfigType,
+    async_add_devices: Callable,
+    discovery_info: dict = None,
+):
+    """Platform uses config entry setup."""
+    pass
+
+
+async def async_setup_entry(
+    hass: HomeAssistantType, entry: ConfigEntry, async_add_entities: Callable
+) -> None:
+    entry_slug: str = slugify_entry(
+        host=entry.data[CONF_HOST], port=entry.data[CONF_PORT]
+    )
+
+    client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
+    coordinator = DSMeteringCoordinator(hass=hass, client=client)
+    hass.data[DOMAIN][entry_slug]["metering"] = coordinator
+
+    # fetch the meter list once, a failure here is not fatal for the other sensors
+    await coordinator.async_refresh()
+
+    # apartment wide sensors sum up all meters
+    apartment: str = f"apartment_{entry_slug}"
+    devices: list = [
+        DigitalstromPowerSensor(
+            coordinator=coordinator,
+            entry_slug=entry_slug,
+            name=entry.data[CONF_ALIAS],
+            identifier=apartment,
+        ),
+        DigitalstromEnergySensor(
+            coordinator=coordinator,
+            entry_slug=entry_slug,
+            name=entry.data[CONF_ALIAS],
+            identifier=apartment,
+        ),
+    ]
+
+    # per meter sensors, meters missing from the first refresh are added
+    # once a later one reports them
+    meters: set = set()
+
+    def meter_sensors() -> list:
+        sensors: list = []
+        meter: dict
+        for dsuid, meter in (coordinator.data or {}).items():
+            if dsuid in meters:
+                continue
+            meters.add(dsuid)
+            _LOGGER.info(f"adding meter sensors for {dsuid}: {meter.get('name')}")
+            name: str = meter.get("name") or dsuid
+            sensors.append(
+                DigitalstromPowerSensor(
+                    coordinator=coordinator,
+                    entry_slug=entry_slug,
+                    name=name,
+                    identifier=dsuid,
+                    dsuid=dsuid,
+                )
+            )
+            sensors.append(
+                DigitalstromEnergySensor(
+                    coordinator=coordinator,
+                    entry_slug=entry_slug,
+                    name=name,
+                    identifier=dsuid,
+                    dsuid=dsuid,
+                )
+            )
+        return sensors
+
+    @callback
+    def add_meter_sensors() -> None:
+        sensors: list = meter_sensors()
+        if sensors:
+            async_add_entities(sensors)
+
+    devices.extend(meter_sensors())
+    coordinator.async_add_listener(add_meter_sensors)
+
+    # command queue metrics
+    kind: str
+    for kind in ("depth", "expired"):
+        devices.append(
+            DigitalstromQueueSensor(
+                stack=client.stack,
+                entry_slug=entry_slug,
+                name=entry.data[CONF_ALIAS],
+                kind=kind,
+            )
+        )
+
+    # scene call confirmation metrics
+    devices.append(
+        DigitalstromLatencySensor(
+            tracker=hass.data[DOMAIN][entry_slug]["tracker"],
+            entry_slug=entry_slug,
+            name=entry.data[CONF_ALIAS],
+        )
+    )
+
+    # event queue metrics
+    listener: DSMultiplexEventListener = hass.data[DOMAIN][entry_slug]["listener"]
+    for kind in ("high_water", "dropped"):
+        devices.append(
+            DigitalstromEventQueueSensor(
+                listener=listener,
+                entry_slug=entry_slug,
+                name=entry.data[CONF_ALIAS],
+                kind=kind,
+            )
+        )
+
+    # zone climate sensors are pushed through websocket events
+    zone_names: dict = {
+        scene.zone_id: scene.zone_name for scene in client.get_scenes().values()
+    }
+    dispatcher: DSSensorDispatcher = hass.data[DOMAIN][entry_slug]["sensor_dispatcher"]
+    try:
+        response: dict = await client.request(url=URL_SENSOR_VALUES)
+    except (DSException, RuntimeError, ConnectionResetError):
+        _LOGGER.warning(f"failed to load zone sensors from {client.host}")
+        response = {}
+
+    zone: dict
+    for zone in response.get("result", {}).get("zones", []):
+        value: dict
+        for value in zone.get("values", []):
+            key: str
+            for key, sensor_type in SENSOR_VALUE_KEYS.items():
+                if key not in value:
+                    continue
+                _LOGGER.info(f"adding zone sensor {zone['id']}: {zone['name']} {key}")
+                devices.append(
+                    DigitalstromEventSensor(
+                        dispatcher=dispatcher,
+                        entry_slug=entry_slug,
+                        source=zone_source(zone_id=zone["id"]),
+                        sensor=sensor_type,
+                        sensor_type=sensor_type,
+                        name=zone["name"],
+                        zone_id=zone["id"],
+                        zone_name=zone_names.get(zone["id"], zone["name"]),
+                        value=value[key],
+                    )
+                )
+
+    # device sensors are only known once they report a value
+    @callback
+    def add_device_sensor(event: DSSensorEvent) -> None:
+        if event.sensor_type not in SENSOR_TYPES:
+            return
+        _LOGGER.info(f"adding device sensor {event.source}: {event.sensor}")
+        async_add_entities(
+            [
+                DigitalstromEventSensor(
+                    dispatcher=dispatcher,
+                    entry_slug=entry_slug,
+                    source=event.source,
+                    sensor=event.sensor,
+                    sensor_type=event.sensor_type,
+                    name=event.source,
+                    zone_id=event.zone_id,
+                    zone_name=zone_names.get(event.zone_id, entry.data[CONF_ALIAS]),
+                    value=event.value,
+                )
+            ]
+        )
+
+    dispatcher.register_unknown(callback=add_device_sensor)
+
+    device: SensorEntity
+    async_add_entities(device for device in devices)
+
+
+class DigitalstromMeterSensor(CoordinatorEntity, SensorEntity):
+    """base for per-circuit and apartment wide metering sensors"""
+
+    KIND: str = None
+
+    def __init__(
+        self,
+        coordinator: DSMeteringCoordinator,
+        entry_slug: str,
+        name: str,
+        identifier: str,
+        dsuid: str = None,
+        *args,
+        **kwargs,
+    ):
+        self._entry_slug: str = entry_slug
+        self._name: str = name
+        self._identifier: str = identifier
+        self._dsuid: str = dsuid
+        super().__init__(coordinator, *args, **kwargs)
+
+    @property
+    def name(self) -> str:
+        return f"{self._name} {self.KIND}"
+
+    @property
+    def unique_id(self) -> str:
+        return f"dsmeter_{self.KIND}_{self._identifier}"
+
+    @property
+    def available(self) -> bool:
+        return super().available and self.native_value is not None
+
+    @property
+    def device_info(self) -> dict:
+        """Return information about the device."""
+        # apartment wide sensors belong to the apartment zone
+        if self._dsuid is None:
+            return zone_device_info(
+                entry_slug=self._entry_slug, zone_id=0, zone_name=self._name
+            )
+        return {
+            "identifiers": {(DOMAIN, self._identifier)},
+            "name": self._name,
+            "model": "DSMeter",
+            "manufacturer": "digitalSTROM AG",
+        }
+
+
+class DigitalstromPowerSensor(DigitalstromMeterSensor):
+    KIND: str = "power"
+
+    @property
+    def device_class(self) -> str:
+        return DEVICE_CLASS_POWER
+
+    @property
+    def state_class(self) -> str:
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        return POWER_WATT
+
+    @property
+    def native_value(self) -> float:
+        return self.coordinator.power(dsuid=self._dsuid)
+
+
+class DigitalstromEnergySensor(DigitalstromMeterSensor):
+    KIND: str = "energy"
+
+    @property
+    def device_class(self) -> str:
+        return DEVICE_CLASS_ENERGY
+
+    @property
+    def state_class(self) -> str:
+        return STATE_CLASS_TOTAL_INCREASING
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        return ENERGY_KILO_WATT_HOUR
+
+    @property
+    def native_value(self) -> float:
+        return self.coordinator.energy(dsuid=self._dsuid)
+
+
+class DigitalstromEventSensor(SensorEntity):
+    """
+    zone or device sensor updated from websocket events
+
+    changes below the dead band of the sensor type are dropped and state
+    writes are limited to one per interval, the latest value is written
+    once the interval has passed
+    """
+
+    def __init__(
+        self,
+        dispatcher: DSSensorDispatcher,
+        entry_slug: str,
+        source: str,
+        sensor: int,
+        sensor_type: int,
+        name: str,
+        zone_id: int,
+        zone_name: str,
+        value: float = None,
+        *args,
+        **kwargs,
+    ):
+        self._dispatcher: DSSensorDispatcher = dispatcher
+        self._entry_slug: str = entry_slug
+        self._source: str = source
+        self._sensor: int = sensor
+        self._zone_id: int = zone_id
+        self._zone_name: str = zone_name
+        self._name: str = name
+        (
+            self._type_name,
+            self._unit,
+            self._device_class,
+            self._dead_band,
+        ) = SENSOR_TYPES[sensor_type]
+        self._value: float = value
+        self._pending: float = None
+        self._last_write: float = 0.0
+        self._unsub_flush: Callable = None
+        super().__init__(*args, **kwargs)
+
+        self.register_callback()
+
+    def register_callback(self) -> None:
+        @callback
+        def event_callback(value: float) -> None:
+            # not worth a state write
+            if self._value is not None and abs(value - self._value) < self._dead_band:
+                self._pending = None
+                return
+
+            # not added yet, keep the value for the first write
+            if self.hass is None:
+                self._value = value
+                return
+
+            # written recently, write the latest value once the interval is over
+            remaining: float = self._last_write + SENSOR_MIN_INTERVAL - time.monotonic()
+            if remaining > 0:
+                self._pending = value
+                if self._unsub_flush is None:
+                    self._unsub_flush = async_call_later(
+                        self.hass, remaining, self._flush_pending
+                    )
+                return
+
+            self._write(value=value)
+
+        self._dispatcher.register(
+            source=self._source, sensor=self._sensor, callback=event_callback
+        )
+
+    @callback
+    def _flush_pending(self, _now) -> None:
+        self._unsub_flush = None
+        if self._pending is not None:
+            self._write(value=self._pending)
+
+    @callback
+    def _write(self, value: float) -> None:
+        self._value = value
+        self._pending = None
+        self._last_write = time.monotonic()
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+
+    @property
+    def name(self) -> str:
+        return f"{self._name} {self._type_name}"
+
+    @property
+    def unique_id(self) -> str:
+        return f"dssensor_{self._entry_slug}_{self._source}_{self._sensor}"
+
+    @property
+    def device_class(self) -> str:
+        return self._device_class
+
+    @property
+    def state_class(self) -> str:
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        return self._unit
+
+    @property
+    def native_value(self) -> float:
+        return self._value
+
+    @property
+    def should_poll(self) -> bool:
+        return False
+
+    @property
+    def device_info(self) -> dict:
+        """Return information about the device."""
+        return zone_device_info(
+            entry_slug=self._entry_slug,
+            zone_id=self._zone_id,
+            zone_name=self._zone_name,
+        )
+
+
+class DigitalstromQueueSensor(SensorEntity):
+    """depth of the command queue or number of expired commands"""
+
+    def __init__(
+        self,
+        stack: DSCommandQueue,
+        entry_slug: str,
+        name: str,
+        kind: str,
+        *args,
+        **kwargs,
+    ):
+        self._stack: DSCommandQueue = stack
+        self._entry_slug: str = entry_slug
+        self._name: str = name
+        self._kind: str = kind
+        super().__init__(*args, **kwargs)
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_COMMAND_QUEUE.format(slug=self._entry_slug),
+                self.async_write_ha_state,
+            )
+        )
+
+    @property
+    def name(self) -> str:
+        if self._kind == "expired":
+            return f"{self._name} expired commands"
+        return f"{self._name} queued commands"
+
+    @property
+    def unique_id(self) -> str:
+        return f"dsqueue_{self._kind}_{self._entry_slug}"
+
+    @property
+    def state_class(self) -> str:
+        if self._kind == "expired":
+            return STATE_CLASS_TOTAL_INCREASING
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def entity_category(self) -> str:
+        return ENTITY_CATEGORY_DIAGNOSTIC
+
+    @property
+    def native_value(self) -> int:
+        if self._kind == "expired":
+            return self._stack.expired
+        return self._stack.depth
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {"online": self._stack.online}
+
+    @property
+    def should_poll(self) -> bool:
+        return False
+
+    @property
+    def device_info(self) -> dict:
+        """Return information about the device."""
+        return zone_device_info(
+            entry_slug=self._entry_slug, zone_id=0, zone_name=self._name
+        )
+
+
+class DigitalstromLatencySensor(SensorEntity):
+    """latency between the last scene call and its echo, with a histogram"""
+
+    def __init__(
+        self,
+        tracker: DSCommandTracker,
+        entry_slug: str,
+        name: str,
+        *args,
+        **kwargs,
+    ):
+        self._tracker: DSCommandTracker = tracker
+        self._entry_slug: str = entry_slug
+        self._name: str = name
+        super().__init__(*args, **kwargs)
+
+    async def async_added_to_hass(self) -> None:
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_COMMAND_LATENCY.format(slug=self._entry_slug),
+                self.async_write_ha_state,
+            )
+        )
+
+    @property
+    def name(self) -> str:
+        return f"{self._name} command latency"
+
+    @property
+    def unique_id(self) -> str:
+        return f"dslatency_{self._entry_slug}"
+
+    @property
+    def state_class(self) -> str:
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        return TIME_MILLISECONDS
+
+    @property
+    def entity_category(self) -> str:
+        return ENTITY_CATEGORY_DIAGNOSTIC
+
+    @property
+    def native_value(self) -> float:
+        return self._tracker.last_latency
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {
+            "mean": self._tracker.mean_latency,
+            "confirmed": self._tracker.confirmed,
+            "retried": self._tracker.retried,
+            "unconfirmed": self._tracker.unconfirmed,
+            **self._tracker.histogram,
+        }
+
+    @property
+    def should_poll(self) -> bool:
+        return False
+
+    @property
+    def device_info(self) -> dict:
+        """Return information about the device."""
+        return zone_device_info(
+            entry_slug=self._entry_slug, zone_id=0, zone_name=self._name
+        )
+
+
+class DigitalstromEventQueueSensor(SensorEntity):
+    """high water mark of the event queue or number of dropped events"""
+
+    def __init__(
+        self,
+        listener: DSMultiplexEventListener,
+        entry_slug: str,
+        name: str,
+        kind: str,
+        *args,
+        **kwargs,
+    ):
+        self._listener: DSMultiplexEventListener = listener
+        self._entry_slug: str = entry_slug
+        self._name: str = name
+        self._kind: str = kind
+        super().__init__(*args, **kwargs)
+
+    @property
+    def name(self) -> str:
+        if self._kind == "dropped":
+            return f"{self._name} dropped events"
+        return f"{self._name} event queue high water mark"
+
+    @property
+    def unique_id(self) -> str:
+        return f"dsevents_{self._kind}_{self._entry_slug}"
+
+    @property
+    def state_class(self) -> str:
+        if self._kind == "dropped":
+            return STATE_CLASS_TOTAL_INCREASING
+        return STATE_CLASS_MEASUREMENT
+
+    @property
+    def entity_category(self) -> str:
+        return ENTITY_CATEGORY_DIAGNOSTIC
+
+    @property
+    def native_value(self) -> int:
+        if self._kind == "dropped":
+            return self._listener.queue.dropped
+        return self._listener.queue.high_water
+
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {
+            "depth": self._listener.queue.depth,
+            "superseded": self._listener.queue.superseded,
+            "overflowed": self._listener.queue.overflowed,
+            "rejected": self._listener.rejected,
+        }
+
+    @property
+    def device_info(self) -> dict:
+        """Return information about the device."""
+        return zone_device_info(
+            entry_slug=self._entry_slug, zone_id=0, zone_name=self._name
+        )
@@ -5,14 +5,17 @@ from typing import Callable, Union
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import STATE_ON, CONF_HOST, CONF_PORT
+from homeassistant.core import callback
 from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.typing import ConfigType, HomeAssistantType
 from pydigitalstrom.client import DSClient
 from pydigitalstrom.devices.scene import DSScene, DSColorScene
-from pydigitalstrom.websocket import DSWebsocketEventListener
 
-from .const import DOMAIN
-from .util import slugify_entry
+from .const import DOMAIN, EVENT_CALL_SCENE
+from .events import DSSceneEvent
+from .listener import DSMultiplexEventListener
+from .tracker import DSCommandTracker
+from .util import slugify_entry, zone_device_info
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -35,7 +38,8 @@ async def async_setup_entry(
     )
 
     client: DSClient = hass.data[DOMAIN][entry_slug]["client"]
-    listener: DSWebsocketEventListener = hass.data[DOMAIN][entry_slug]["listener"]
+    listener: DSMultiplexEventListener = hass.data[DOMAIN][entry_slug]["listener"]
+    tracker: DSCommandTracker = hass.data[DOMAIN][entry_slug]["tracker"]
     devices: list = []
     scenes: dict = client.get_scenes()
 
@@ -60,7 +64,12 @@ async def async_setup_entry(
         # add sensors
         devices.append(
             DigitalstromSwitch(
-                hass=hass, scene_on=scene, scene_off=scene_off, listener=listener
+                hass=hass,
+                entry_slug=entry_slug,
+                scene_on=scene,
+                scene_off=scene_off,
+                listener=listener,
+                tracker=tracker,
             )
         )
 
@@ -72,17 +81,24 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
     def __init__(
         self,
         hass: HomeAssistantType,
+        entry_slug: str,
         scene_on: DSScene,
         scene_off: DSScene,
-        listener: DSWebsocketEventListener,
+        listener: DSMultiplexEventListener,
+        tracker: DSCommandTracker,
         *args,
         **kwargs,
     ):
         self._hass: HomeAssistantType = hass
+        self._entry_slug: str = entry_slug
         self._scene_on: DSScene = scene_on
         self._scene_off: DSScene = scene_off
-        self._listener: DSWebsocketEventListener = listener
+        self._listener: DSMultiplexEventListener = listener
+        self._tracker: DSCommandTracker = tracker
         self._state: bool = None
+        # whether the dSS echoed the last command, None while waiting
+        self._confirmed: bool = None
+        self._watched: DSScene = None
 
         # sleeping default is false
         if self._scene_on.scene_id == 69:
@@ -95,22 +111,9 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
         self.register_callback()
 
     def register_callback(self) -> None:
-        async def event_callback(event: dict):
-            # sanity checks
-            if "name" not in event:
-                return
-            if event["name"] != "callScene":
-                return
-            if "properties" not in event:
-                return
-            if "sceneID" not in event["properties"]:
-                return
-            if "zoneID" not in event["properties"]:
-                return
-
-            # cast event data
-            zone_id: int = int(event["properties"]["zoneID"])
-            scene_id: int = int(event["properties"]["sceneID"])
+        async def event_callback(event: DSSceneEvent) -> None:
+            zone_id: int = event.zone_id
+            scene_id: int = event.scene_id
 
             # turn on scene called
             if (
@@ -127,7 +130,7 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
                 self._state = False
                 await self.async_update_ha_state()
 
-        self._listener.register(callback=event_callback)
+        self._listener.register(callback=event_callback, event_name=EVENT_CALL_SCENE)
 
     @property
     def name(self) -> str:
@@ -145,14 +148,44 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
     def is_on(self) -> bool:
         return self._state
 
+    @property
+    def extra_state_attributes(self) -> dict:
+        return {"confirmed": self._confirmed}
+
+    def scheduled_scene(self, turn_on: bool) -> DSScene:
+        """scene called for this entity by the schedule_scenes service"""
+        return self._scene_on if turn_on else self._scene_off
+
     async def async_turn_on(self, **kwargs) -> None:
+        self._watch(scene=self._scene_on)
         await self._scene_on.turn_on()
         self._state = True
 
     async def async_turn_off(self, **kwargs) -> None:
+        self._watch(scene=self._scene_off)
         await self._scene_off.turn_on()
         self._state = False
 
+    def _watch(self, scene: DSScene) -> None:
+        self._confirmed = None
+        self._watched = scene
+
+        @callback
+        def confirm(confirmed: bool) -> None:
+            # only the last command of the entity counts
+            if self._watched is not scene:
+                return
+            self._confirmed = confirmed
+            if self.hass is not None:
+                self.async_write_ha_state()
+
+        self._tracker.watch(
+            zone_id=scene.zone_id,
+            group_id=getattr(scene, "color", 0),
+            scene_id=scene.scene_id,
+            callback=confirm,
+        )
+
     async def async_added_to_hass(self) -> None:
         await super().async_added_to_hass()
         state: bool = await self.async_get_last_state()
@@ -170,9 +203,8 @@ class DigitalstromSwitch(RestoreEntity, SwitchEntity):
     @property
     def device_info(self) -> dict:
         """Return information about the device."""
-        return {
-            "identifiers": {(DOMAIN, self._scene_off.unique_id)},
-            "name": self._scene_off.name,
-            "model": "DSSwitch",
-            "manufacturer": "digitalSTROM AG",
-        }
+        return zone_device_info(
+            entry_slug=self._entry_slug,
+            zone_id=self._scene_off.zone_id,
+            zone_name=self._scene_off.zone_name,
+        )
@@ -0,0 +1,222 @@
+# -*- coding: UTF-8 -*-
+import bisect
+import logging
+import time
+from typing import Callable, Dict, List, Set, Tuple
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.typing import HomeAssistantType
+from pydigitalstrom.client import DSClient
+
+from .const import (
+    ACK_LATENCY_BUCKETS,
+    ACK_RETRIES,
+    OPTION_ACK_TIMEOUT_DEFAULT,
+    SIGNAL_COMMAND_LATENCY,
+)
+from .events import DSSceneEvent
+from .util import scene_area, scene_call
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DSCommandTracker:
+    """
+    match scene calls sent by the command stack with their callScene echo
+
+    the time between sending a call and receiving its echo is recorded in a
+    latency histogram. a call without echo within the timeout is sent again,
+    once the retries are used up it is counted as unconfirmed. a newer call
+    or echo for the same zone, group and area supersedes a waiting call
+    instead. entities can watch a scene call to learn whether it was
+    confirmed, watchers of superseded calls learn it was not
+
+    echoes are observed before they enter the event queue, so echoes
+    superseded in the queue still confirm their calls
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistantType,
+        client: DSClient,
+        entry_slug: str,
+        timeout: int = OPTION_ACK_TIMEOUT_DEFAULT,
+        retries: int = ACK_RETRIES,
+    ):
+        self._hass: HomeAssistantType = hass
+        self._client: DSClient = client
+        self._entry_slug: str = entry_slug
+        self._timeout: int = timeout
+        self._retries: int = retries
+        # (zone, group, scene) to [url, send time, attempts, timeout handle]
+        self._pending: Dict[Tuple[int, int, int], list] = {}
+        # (zone, group, scene) to callbacks waiting for a confirmation
+        self._watchers: Dict[Tuple[int, int, int], Set[Callable]] = {}
+
+        # one count per bucket, the last one is for anything slower
+        self.buckets: List[int] = [0] * (len(ACK_LATENCY_BUCKETS) + 1)
+        self.confirmed: int = 0
+        self.retried: int = 0
+        self.unconfirmed: int = 0
+        self.latency_sum: float = 0.0
+        self.last_latency: float = None
+
+    @property
+    def histogram(self) -> Dict[str, int]:
+        bounds: list = [f"le_{bound}ms" for bound in ACK_LATENCY_BUCKETS] + ["slower"]
+        return dict(zip(bounds, self.buckets))
+
+    @property
+    def mean_latency(self) -> float:
+        if not self.confirmed:
+            return None
+        return round(self.latency_sum / self.confirmed, 1)
+
+    def watch(
+        self, zone_id: int, group_id: int, scene_id: int, callback: Callable
+    ) -> None:
+        """call back with True once the scene call is confirmed, False if it never is"""
+        self._watchers.setdefault((zone_id, group_id, scene_id), set()).add(callback)
+
+    def sending(self, url: str) -> None:
+        """a command is about to be sent, its echo may beat the response"""
+        key: tuple = scene_call(url=url)
+        if key is None:
+            return
+
+        # a newer call for the same target makes older unconfirmed ones moot,
+        # including calls that were replaced in the stack and never sent
+        self._supersede(key=key, watchers=True)
+
+        pending: list = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [url, time.monotonic(), 0, None]
+            return
+        pending[1] = time.monotonic()
+        if pending[3] is not None:
+            pending[3]()
+            pending[3] = None
+
+    def sent(self, url: str) -> None:
+        """the server accepted the command, start waiting for its echo"""
+        key: tuple = scene_call(url=url)
+        pending: list = self._pending.get(key)
+        if pending is None or pending[3] is not None:
+            return
+        pending[2] += 1
+
+        @callback
+        def expired(_now) -> None:
+            pending[3] = None
+            self._expired(key=key)
+
+        pending[3] = async_call_later(self._hass, self._timeout, expired)
+
+    def failed(self, url: str) -> None:
+        """the command was dropped without reaching the bus, or before it was sent"""
+        key: tuple = scene_call(url=url)
+        if key is None:
+            return
+        if key in self._pending:
+            self._forget(key=key)
+        elif key in self._watchers:
+            self._resolve(key=key, confirmed=False)
+        else:
+            return
+        self.unconfirmed += 1
+        self._changed()
+
+    @callback
+    def observe_event(self, event: DSSceneEvent) -> None:
+        key: tuple = (event.zone_id, event.group_id, event.scene_id)
+
+        # e.g. a wall switch called another scene of the area, don't resend
+        self._supersede(key=key, watchers=False)
+
+        pending: list = self._pending.pop(key, None)
+        if pending is not None:
+            if pending[3] is not None:
+                pending[3]()
+            latency: float = (time.monotonic() - pending[1]) * 1000.0
+            self.buckets[bisect.bisect_left(ACK_LATENCY_BUCKETS, latency)] += 1
+            self.confirmed += 1
+            self.latency_sum += latency
+            self.last_latency = round(latency, 1)
+            self._changed()
+
+        # also confirms watchers of a call that was superseded in the stack
+        self._resolve(key=key, confirmed=True)
+
+    @callback
+    def async_cancel(self) -> None:
+        for key in list(self._pending):
+            self._forget(key=key)
+
+    def _expired(self, key: tuple) -> None:
+        pending: list = self._pending.get(key)
+        if pending is None:
+            return
+        url: str = pending[0]
+
+        # a newer command for the target waits in the stack and replaces this
+        # one, sending it resolves the watchers
+        if self._client.stack.queued(url=url):
+            self._forget(key=key, resolve=False)
+            return
+
+        if pending[2] <= self._retries:
+            _LOGGER.warning(
+                f"no confirmation for {url} from {self._client.host}, sending again"
+            )
+            self.retried += 1
+            self._changed()
+            self._hass.async_create_task(self._client.stack.append(url=url))
+            return
+
+        _LOGGER.warning(f"no confirmation for {url} from {self._client.host}")
+        del self._pending[key]
+        self.unconfirmed += 1
+        self._changed()
+        self._resolve(key=key, confirmed=False)
+
+    def _supersede(self, key: tuple, watchers: bool) -> None:
+        target: tuple = _target(key=key)
+        other: tuple
+        for other in [
+            other
+            for other in self._pending
+            if other != key and _target(key=other) == target
+        ]:
+            self._forget(key=other)
+        if not watchers:
+            return
+        for other in [
+            other
+            for other in self._watchers
+            if other != key and _target(key=other) == target
+        ]:
+            self._resolve(key=other, confirmed=False)
+
+    def _forget(self, key: tuple, resolve: bool = True) -> None:
+        pending: list = self._pending.pop(key)
+        if pending[3] is not None:
+            pending[3]()
+        if resolve:
+            self._resolve(key=key, confirmed=False)
+
+    def _resolve(self, key: tuple, confirmed: bool) -> None:
+        watcher: Callable
+        for watcher in self._watchers.pop(key, ()):
+            watcher(confirmed)
+
+    def _changed(self) -> None:
+        async_dispatcher_send(
+            self._hass, SIGNAL_COMMAND_LATENCY.format(slug=self._entry_slug)
+        )
+
+
+def _target(key: tuple) -> tuple:
+    """calls of the same zone, group and area supersede each other"""
+    return key[0], key[1], scene_area(scene_id=key[2])
@@ -1,7 +1,72 @@
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
 from homeassistant.util import slugify
 
-from .const import SLUG_FORMAT
+from .const import DOMAIN, SLUG_FORMAT
 
 
 def slugify_entry(host, port):
     return slugify(SLUG_FORMAT.format(host=host, port=port))
+
+
+def command_target(url: str) -> Tuple[str, str, str, str]:
+    """
+    get the (path, zone, group, area) a command acts on
+
+    area scenes share a target per area so an on, off or stop call of the
+    same area supersede each other, any other scene is its own target
+    """
+    parsed = urlparse(url)
+    query: dict = parse_qs(parsed.query)
+    zone: str = query.get("id", [""])[0]
+    group: str = query.get("groupID", [""])[0]
+    scene: str = query.get("sceneNumber", [""])[0]
+    if scene.isdigit():
+        scene = scene_area(scene_id=int(scene))
+    return parsed.path, zone, group, scene
+
+
+def scene_call(url: str) -> Optional[Tuple[int, int, int]]:
+    """get the (zone, group, scene) of a scene call, None for other commands"""
+    parsed = urlparse(url)
+    if not parsed.path.endswith("/callScene"):
+        return None
+    query: dict = parse_qs(parsed.query)
+    try:
+        return (
+            int(query.get("id", ["0"])[0]),
+            int(query.get("groupID", ["0"])[0]),
+            int(query["sceneNumber"][0]),
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+def scene_area(scene_id: int) -> str:
+    """
+    on, off and stop scenes of an area share the same area, others are their own
+
+    areas 1-4 stop with scenes 52-55, the whole zone stops with scene 15
+    """
+    if scene_id < 10:
+        return f"area{scene_id % 5}"
+    if 52 <= scene_id <= 55:
+        return f"area{scene_id - 51}"
+    if scene_id == 15:
+        return "area0"
+    return str(scene_id)
+
+
+def zone_identifier(entry_slug: str, zone_id: int) -> str:
+    return f"{entry_slug}_zone{zone_id}"
+
+
+def zone_device_info(entry_slug: str, zone_id: int, zone_name: str) -> dict:
+    """device of a digitalSTROM zone, zone 0 is the whole apartment"""
+    return {
+        "identifiers": {(DOMAIN, zone_identifier(entry_slug=entry_slug, zone_id=zone_id))},
+        "name": zone_name,
+        "model": "DSApartment" if zone_id == 0 else "DSZone",
+        "manufacturer": "digitalSTROM AG",
+    }
@@ -0,0 +1,21 @@
+"""Local digitalSTROM server simulator for tests and load tests."""
+from .server import (
+    DSSimulator,
+    button_click_event,
+    call_scene_event,
+    keep_alive_event,
+    make_ssl_context,
+    zone_sensor_event,
+)
+from .thread import DSSimulatorThread, free_port
+
+__all__ = [
+    "DSSimulator",
+    "DSSimulatorThread",
+    "button_click_event",
+    "call_scene_event",
+    "free_port",
+    "keep_alive_event",
+    "make_ssl_context",
+    "zone_sensor_event",
+]
@@ -0,0 +1,58 @@
+"""Run a dSS simulator as a standalone process, e.g. for load tests."""
+import argparse
+import asyncio
+import logging
+
+from .server import DSSimulator, make_ssl_context
+
+
+async def run(args: argparse.Namespace) -> None:
+    simulator = DSSimulator(
+        host=args.host,
+        port=args.port,
+        zones=args.zones,
+        meters=args.meters,
+        buttons=args.buttons,
+        ssl_context=make_ssl_context(certfile=args.certfile, keyfile=args.keyfile),
+    )
+    simulator.latency = args.latency / 1000
+    simulator.failure_rate = args.failure_rate
+    await simulator.start()
+
+    try:
+        while True:
+            if args.event_rate:
+                await simulator.emit_load(count=args.event_rate, rate=args.event_rate)
+            else:
+                await asyncio.sleep(3600)
+    finally:
+        await simulator.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m dss_simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--zones", type=int, default=3, help="number of rooms")
+    parser.add_argument("--meters", type=int, default=2, help="number of dSMs")
+    parser.add_argument("--buttons", type=int, default=2, help="number of buttons")
+    parser.add_argument("--latency", type=float, default=0, help="request latency in ms")
+    parser.add_argument(
+        "--failure-rate", type=float, default=0, help="share of failing requests (0-1)"
+    )
+    parser.add_argument(
+        "--event-rate", type=int, default=0, help="random events per second"
+    )
+    parser.add_argument("--certfile", help="defaults to a generated self-signed one")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
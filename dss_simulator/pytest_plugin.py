@@ -0,0 +1,23 @@
+"""
+pytest fixtures running a dSS simulator
+
+enable them with ``pytest_plugins = ["dss_simulator.pytest_plugin"]``
+"""
+import pytest
+
+from .server import DSSimulator
+from .thread import DSSimulatorThread, free_port
+
+
+@pytest.fixture
+def dss_simulator_thread():
+    """a running simulator on a free local port, scriptable through .simulator"""
+    thread = DSSimulatorThread(simulator=DSSimulator(port=free_port()))
+    thread.start()
+    yield thread
+    thread.stop()
+
+
+@pytest.fixture
+def dss_simulator(dss_simulator_thread) -> DSSimulator:
+    return dss_simulator_thread.simulator
@@ -0,0 +1,439 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+import datetime
+import logging
+import os
+import random
+import ssl
+import tempfile
+import uuid
+from typing import Dict, List, Optional, Set
+
+from aiohttp import WSMsgType, web
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_USERNAME = "dssadmin"
+DEFAULT_PASSWORD = "dssadmin"
+
+# area scenes of light (1) and cover (2) groups, off 0-4, on 5-9
+AREA_SCENES: Dict[int, str] = {
+    0: "off",
+    1: "area 1 off",
+    2: "area 2 off",
+    3: "area 3 off",
+    4: "area 4 off",
+    5: "on",
+    6: "area 1 on",
+    7: "area 2 on",
+    8: "area 3 on",
+    9: "area 4 on",
+}
+
+
+def make_ssl_context(certfile: str = None, keyfile: str = None) -> ssl.SSLContext:
+    """
+    ssl context of the simulator, like most digitalSTROM servers it uses
+    a self-signed certificate unless one is given
+    """
+    if certfile is None:
+        certfile, keyfile = _self_signed_certificate()
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile=certfile, keyfile=keyfile)
+    return context
+
+
+def _self_signed_certificate():
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "dss.local")])
+    now = datetime.datetime.utcnow()
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=365))
+        .sign(key, hashes.SHA256())
+    )
+
+    directory: str = tempfile.mkdtemp(prefix="dss_simulator_")
+    certfile: str = os.path.join(directory, "cert.pem")
+    keyfile: str = os.path.join(directory, "key.pem")
+    with open(certfile, "wb") as handle:
+        handle.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(keyfile, "wb") as handle:
+        handle.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            )
+        )
+    return certfile, keyfile
+
+
+class DSSimulator:
+    """
+    digitalSTROM server speaking the subset of the JSON API and websocket
+    event stream used by the integration
+
+    behaviour can be scripted while running: latency delays every request,
+    failure_rate answers a share of requests with a server error,
+    fail_paths fails requests to given API paths, offline refuses all
+    requests, drop_connections() closes every websocket and
+    expire_sessions() invalidates every session token like a dSS restart
+
+    like a dSS, connected websockets get a keepWebserviceAlive event every
+    keep_alive seconds
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        zones: int = 3,
+        meters: int = 2,
+        buttons: int = 2,
+        username: str = DEFAULT_USERNAME,
+        password: str = DEFAULT_PASSWORD,
+        ssl_context: ssl.SSLContext = None,
+        keep_alive: float = 30,
+    ):
+        self.host: str = host
+        self.port: int = port
+        self.username: str = username
+        self.password: str = password
+        self._ssl_context: Optional[ssl.SSLContext] = ssl_context
+
+        # scriptable behaviour
+        self.latency: float = 0.0
+        self.failure_rate: float = 0.0
+        self.fail_paths: Set[str] = set()
+        self.offline: bool = False
+        self.keep_alive: float = keep_alive
+
+        # recorded interaction
+        self.requests: List[str] = []
+        self.called_scenes: List[dict] = []
+
+        self._app_tokens: Dict[str, bool] = {}
+        self._temp_tokens: Set[str] = set()
+        self._session_tokens: Set[str] = set()
+        self._websockets: Set[web.WebSocketResponse] = set()
+        self._runner: Optional[web.AppRunner] = None
+        self._keep_alive_task: Optional[asyncio.Task] = None
+
+        self.zones: Dict[int, str] = {0: ""}
+        self.zones.update({zone: f"Room {zone}" for zone in range(1, zones + 1)})
+        self.meters: Dict[str, dict] = {
+            f"{index:034x}": {
+                "dSUID": f"{index:034x}",
+                "name": f"Circuit {index}",
+                "powerConsumption": 100 * index,
+                "energyMeterValue": 10000 * index,
+            }
+            for index in range(1, meters + 1)
+        }
+        self.buttons: List[dict] = [
+            {
+                "id": f"{index:024x}",
+                "dSUID": f"{index:034x}b",
+                "name": f"Button {index}",
+                "zoneID": (index % zones) + 1 if zones else 0,
+                "buttonInputCount": 1,
+            }
+            for index in range(1, buttons + 1)
+        ]
+
+    @property
+    def connections(self) -> int:
+        """number of connected websockets"""
+        return len(self._websockets)
+
+    @property
+    def url(self) -> str:
+        return f"https://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        if self._ssl_context is None:
+            self._ssl_context = make_ssl_context()
+
+        app = web.Application()
+        app.router.add_get("/websocket", self._websocket)
+        app.router.add_get("/json/{path:.*}", self._json)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(
+            self._runner, host=self.host, port=self.port, ssl_context=self._ssl_context
+        )
+        await site.start()
+        self._keep_alive_task = asyncio.ensure_future(self._keep_alive())
+        _LOGGER.info(f"dSS simulator listening on {self.url}")
+
+    async def stop(self) -> None:
+        if self._keep_alive_task is not None:
+            self._keep_alive_task.cancel()
+            self._keep_alive_task = None
+        await self.drop_connections()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # scripting
+
+    async def drop_connections(self) -> None:
+        websocket: web.WebSocketResponse
+        for websocket in list(self._websockets):
+            await websocket.close()
+        self._websockets.clear()
+
+    async def expire_sessions(self) -> None:
+        self._session_tokens.clear()
+
+    async def emit(self, event: dict) -> None:
+        """send an event to every connected websocket"""
+        websocket: web.WebSocketResponse
+        for websocket in list(self._websockets):
+            try:
+                await websocket.send_json(event)
+            except ConnectionError:
+                self._websockets.discard(websocket)
+
+    async def emit_load(self, count: int, rate: float) -> None:
+        """emit random scene and sensor events at a rate per second"""
+        interval: float = 1 / rate if rate else 0
+        zone_ids: List[int] = list(self.zones)
+        scene_ids: List[int] = list(AREA_SCENES)
+        for _ in range(count):
+            zone_id: int = random.choice(zone_ids)
+            if random.random() < 0.5:
+                event: dict = call_scene_event(
+                    zone_id=zone_id,
+                    group_id=random.choice((1, 2)),
+                    scene_id=random.choice(scene_ids),
+                )
+            else:
+                event = zone_sensor_event(
+                    zone_id=zone_id, sensor_type=9, value=round(random.uniform(18, 24), 1)
+                )
+            await self.emit(event=event)
+            if interval:
+                await asyncio.sleep(interval)
+
+    async def _keep_alive(self) -> None:
+        while True:
+            await asyncio.sleep(self.keep_alive)
+            await self.emit(event=keep_alive_event())
+
+    # http api
+
+    async def _json(self, request: web.Request) -> web.Response:
+        self.requests.append(request.path_qs)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if (
+            self.offline
+            or request.path in self.fail_paths
+            or random.random() < self.failure_rate
+        ):
+            return web.Response(status=500, text="simulated failure")
+
+        path: str = request.match_info["path"]
+        handler = self._handlers().get(path)
+        if handler is None:
+            return _result(ok=False, message=f"unknown call {path}")
+
+        # everything but token handling needs a session
+        if path not in (
+            "system/requestApplicationToken",
+            "system/login",
+            "system/enableToken",
+            "system/loginApplication",
+        ) and request.query.get("token") not in self._session_tokens:
+            return _result(ok=False, message="Application-Authentication failed")
+
+        return await handler(request.query)
+
+    def _handlers(self) -> dict:
+        return {
+            "system/requestApplicationToken": self._request_application_token,
+            "system/login": self._login,
+            "system/enableToken": self._enable_token,
+            "system/loginApplication": self._login_application,
+            "system/version": self._version,
+            "property/query2": self._query,
+            "apartment/getSensorValues": self._sensor_values,
+            "apartment/getDevices": self._devices,
+            "zone/callScene": self._call_scene,
+            "apartment/callScene": self._call_apartment_scene,
+            "zone/setValue": self._set_value,
+        }
+
+    async def _request_application_token(self, query) -> web.Response:
+        token: str = uuid.uuid4().hex
+        self._app_tokens[token] = False
+        return _result(result={"applicationToken": token})
+
+    async def _login(self, query) -> web.Response:
+        if query.get("user") != self.username or query.get("password") != self.password:
+            return _result(ok=False, message="Authentication failed")
+        token: str = uuid.uuid4().hex
+        self._temp_tokens.add(token)
+        return _result(result={"token": token})
+
+    async def _enable_token(self, query) -> web.Response:
+        app_token: str = query.get("applicationToken")
+        if query.get("token") not in self._temp_tokens or app_token not in self._app_tokens:
+            return _result(ok=False, message="Authentication failed")
+        self._app_tokens[app_token] = True
+        return _result()
+
+    async def _login_application(self, query) -> web.Response:
+        if not self._app_tokens.get(query.get("loginToken")):
+            return _result(ok=False, message="Application-Authentication failed")
+        token: str = uuid.uuid4().hex
+        self._session_tokens.add(token)
+        return _result(result={"token": token})
+
+    async def _version(self, query) -> web.Response:
+        return _result(result={"version": "dSS simulator"})
+
+    async def _query(self, query) -> web.Response:
+        path: str = query.get("query", "")
+        if path.startswith("/apartment/dSMeters"):
+            return _result(result=dict(self.meters))
+        if path.startswith("/apartment/zones"):
+            return _result(result=self._structure())
+        return _result(ok=False, message=f"unknown query {path}")
+
+    def _structure(self) -> dict:
+        structure: dict = {}
+        for zone_id, zone_name in self.zones.items():
+            zone: dict = {"ZoneID": zone_id, "name": zone_name}
+            for color in (1, 2):
+                zone[f"group{color}"] = {
+                    "color": color,
+                    **{
+                        f"scene{scene_id}": {
+                            "scene": scene_id,
+                            "name": f"{zone_name} {'light' if color == 1 else 'shade'} {name}",
+                        }
+                        for scene_id, name in AREA_SCENES.items()
+                    },
+                }
+            structure[f"zone{zone_id}"] = zone
+        return structure
+
+    async def _sensor_values(self, query) -> web.Response:
+        return _result(
+            result={
+                "zones": [
+                    {
+                        "id": zone_id,
+                        "name": zone_name,
+                        "values": [{"TemperatureValue": 21.0}, {"HumidityValue": 45.0}],
+                    }
+                    for zone_id, zone_name in self.zones.items()
+                    if zone_id
+                ]
+            }
+        )
+
+    async def _devices(self, query) -> web.Response:
+        return _result(result=self.buttons)
+
+    async def _call_scene(self, query) -> web.Response:
+        try:
+            zone_id: int = int(query["id"])
+            scene_id: int = int(query["sceneNumber"])
+            group_id: int = int(query.get("groupID", 0))
+        except (KeyError, ValueError):
+            return _result(ok=False, message="missing parameter")
+
+        self.called_scenes.append(
+            {"zone_id": zone_id, "group_id": group_id, "scene_id": scene_id}
+        )
+        await self.emit(
+            event=call_scene_event(zone_id=zone_id, group_id=group_id, scene_id=scene_id)
+        )
+        return _result()
+
+    async def _call_apartment_scene(self, query) -> web.Response:
+        # apartment scenes are echoed for zone 0
+        return await self._call_scene({**query, "id": "0"})
+
+    async def _set_value(self, query) -> web.Response:
+        return _result()
+
+    # websocket
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        if request.cookies.get("token") not in self._session_tokens:
+            raise web.HTTPForbidden()
+
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        self._websockets.add(websocket)
+        try:
+            async for message in websocket:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._websockets.discard(websocket)
+        return websocket
+
+
+def _result(ok: bool = True, result: dict = None, message: str = None) -> web.Response:
+    data: dict = {"ok": ok}
+    if result is not None:
+        data["result"] = result
+    if message is not None:
+        data["message"] = message
+    return web.json_response(data)
+
+
+def keep_alive_event() -> dict:
+    return {"name": "keepWebserviceAlive", "properties": {}, "source": {}}
+
+
+def call_scene_event(zone_id: int, group_id: int, scene_id: int) -> dict:
+    return {
+        "name": "callScene",
+        "properties": {
+            "zoneID": str(zone_id),
+            "groupID": str(group_id),
+            "sceneID": str(scene_id),
+        },
+        "source": {"zoneID": zone_id, "groupID": group_id, "isGroup": True},
+    }
+
+
+def zone_sensor_event(zone_id: int, sensor_type: int, value: float) -> dict:
+    return {
+        "name": "zoneSensorValue",
+        "properties": {
+            "zoneID": str(zone_id),
+            "sensorType": str(sensor_type),
+            "sensorValueFloat": str(value),
+        },
+        "source": {"zoneID": zone_id, "isApartment": False},
+    }
+
+
+def button_click_event(dsid: str, click_type: int, button_index: int = 0) -> dict:
+    return {
+        "name": "buttonClick",
+        "properties": {
+            "buttonIndex": str(button_index),
+            "clickType": str(click_type),
+            "holdCount": "0",
+        },
+        "source": {"dsid": dsid, "isDevice": True},
+    }
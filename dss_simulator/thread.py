@@ -0,0 +1,49 @@
+# -*- coding: UTF-8 -*-
+import asyncio
+import socket
+import threading
+
+from .server import DSSimulator
+
+
+def free_port() -> int:
+    """a local port nothing listens on right now"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class DSSimulatorThread:
+    """
+    run a simulator on its own event loop in a background thread
+
+    this keeps the simulator independent from the loop of the code under
+    test, coroutines like emit() are run on the simulator loop with call()
+    """
+
+    def __init__(self, simulator: DSSimulator):
+        self.simulator: DSSimulator = simulator
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="dss-simulator", daemon=True
+        )
+
+    def start(self) -> DSSimulator:
+        self._thread.start()
+        self.call(self.simulator.start())
+        return self.simulator
+
+    def stop(self) -> None:
+        self.call(self.simulator.stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def call(self, coroutine, timeout: float = 30):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    async def async_call(self, coroutine):
+        """like call(), awaited from another event loop without blocking it"""
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        )
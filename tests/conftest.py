@@ -0,0 +1,9 @@
+import pytest
+
+pytest_plugins = ["dss_simulator.pytest_plugin"]
+
+
+@pytest.fixture(autouse=True)
+def simulator_sockets(socket_enabled):
+    """the home assistant test harness blocks sockets, the simulator needs local ones"""
+    yield
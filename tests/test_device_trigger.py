@@ -0,0 +1,22 @@
+import pytest
+import voluptuous as vol
+
+from custom_components.digitalstrom.const import DOMAIN
+from custom_components.digitalstrom.device_trigger import TRIGGER_SCHEMA
+
+
+def trigger(subtype: str) -> dict:
+    return {
+        "platform": "device",
+        "domain": DOMAIN,
+        "device_id": "button",
+        "type": "tip_1x",
+        "subtype": subtype,
+    }
+
+
+def test_subtype_is_a_button_input():
+    assert TRIGGER_SCHEMA(trigger(subtype="button_1"))["subtype"] == "button_1"
+    for subtype in ("button_", "button_x", "1", "button_1 "):
+        with pytest.raises(vol.Invalid):
+            TRIGGER_SCHEMA(trigger(subtype=subtype))
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from pydigitalstrom.apptokenhandler import DSAppTokenHandler
+from pydigitalstrom.client import DSClient
+from pydigitalstrom.devices.scene import DSColorScene
+from pydigitalstrom.exceptions import DSCommandFailedException
+from pydigitalstrom.websocket import DSWebsocketEventListener
+
+from dss_simulator import DSSimulator, DSSimulatorThread, free_port
+
+
+async def connect(simulator) -> DSClient:
+    apptoken: str = await DSAppTokenHandler(
+        host=simulator.host,
+        port=simulator.port,
+        username=simulator.username,
+        password=simulator.password,
+    ).request_apptoken()
+    client = DSClient(
+        host=simulator.host,
+        port=simulator.port,
+        apptoken=apptoken,
+        apartment_name="Apartment",
+        loop=asyncio.get_running_loop(),
+    )
+    await client.initialize()
+    return client
+
+
+def test_call_scene_is_echoed(dss_simulator):
+    async def scenario() -> dict:
+        client: DSClient = await connect(simulator=dss_simulator)
+        assert client.get_scenes()
+
+        received: asyncio.Queue = asyncio.Queue()
+
+        async def on_event(event: dict) -> None:
+            received.put_nowait(event)
+
+        listener = DSWebsocketEventListener(client=client, event_name="callScene")
+        listener.register(callback=on_event)
+        listen = asyncio.ensure_future(listener.start())
+        while not dss_simulator.connections:
+            await asyncio.sleep(0.01)
+
+        try:
+            await client.request(
+                url=DSColorScene.URL_TURN_ON.format(zone_id=1, color=1, scene_id=5)
+            )
+            return await asyncio.wait_for(received.get(), timeout=5)
+        finally:
+            listen.cancel()
+
+    event: dict = asyncio.run(scenario())
+    assert event["properties"] == {"zoneID": "1", "groupID": "1", "sceneID": "5"}
+    assert dss_simulator.called_scenes == [{"zone_id": 1, "group_id": 1, "scene_id": 5}]
+
+
+def test_sessions_survive_dropped_connections(dss_simulator_thread):
+    simulator = dss_simulator_thread.simulator
+    url: str = DSColorScene.URL_TURN_ON.format(zone_id=1, color=1, scene_id=0)
+
+    async def scenario() -> None:
+        client: DSClient = await connect(simulator=simulator)
+
+        await dss_simulator_thread.async_call(simulator.drop_connections())
+        await client.request(url=url)
+
+        await dss_simulator_thread.async_call(simulator.expire_sessions())
+        with pytest.raises(DSCommandFailedException):
+            await client.request(url=url)
+
+    asyncio.run(scenario())
+    assert len(simulator.called_scenes) == 1
+
+
+def test_websockets_are_kept_alive():
+    thread = DSSimulatorThread(simulator=DSSimulator(port=free_port(), keep_alive=0.05))
+    simulator: DSSimulator = thread.start()
+
+    async def scenario() -> dict:
+        client: DSClient = await connect(simulator=simulator)
+        received: asyncio.Queue = asyncio.Queue()
+
+        async def on_event(event: dict) -> None:
+            received.put_nowait(event)
+
+        listener = DSWebsocketEventListener(client=client, event_name="keepWebserviceAlive")
+        listener.register(callback=on_event)
+        listen = asyncio.ensure_future(listener.start())
+        try:
+            return await asyncio.wait_for(received.get(), timeout=5)
+        finally:
+            listen.cancel()
+
+    try:
+        event: dict = asyncio.run(scenario())
+    finally:
+        thread.stop()
+    assert event["name"] == "keepWebserviceAlive"
@@ -0,0 +1,189 @@
+import asyncio
+from typing import Callable
+
+from homeassistant import config_entries, data_entry_flow
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_ALIAS,
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_PORT,
+    CONF_TOKEN,
+    CONF_USERNAME,
+    EVENT_HOMEASSISTANT_START,
+    STATE_OFF,
+    STATE_ON,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry, entity_registry
+from pydigitalstrom.apptokenhandler import DSAppTokenHandler
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.digitalstrom.const import CONF_DELAY, DOMAIN
+from custom_components.digitalstrom.util import slugify_entry
+from dss_simulator import DSSimulator, DSSimulatorThread, call_scene_event
+
+LIGHT = "light.room_1_room_1_light_off"
+
+
+async def configure(hass: HomeAssistant, simulator: DSSimulator) -> ConfigEntry:
+    result: dict = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"],
+        {
+            CONF_HOST: simulator.host,
+            CONF_PORT: simulator.port,
+            CONF_USERNAME: simulator.username,
+            CONF_PASSWORD: simulator.password,
+            CONF_ALIAS: "Apartment",
+            CONF_DELAY: 10,
+        },
+    )
+    assert result["type"] == data_entry_flow.RESULT_TYPE_CREATE_ENTRY
+    await hass.async_block_till_done()
+    return result["result"]
+
+
+async def wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    """the listener runs forever, so hass.async_block_till_done() can't be used"""
+    for _ in range(int(timeout / 0.02)):
+        if condition():
+            return
+        await asyncio.sleep(0.02)
+    raise AssertionError("condition not met in time")
+
+
+async def test_config_flow_sets_up_entry(
+    hass: HomeAssistant, enable_custom_integrations, dss_simulator: DSSimulator
+):
+    entry: ConfigEntry = await configure(hass=hass, simulator=dss_simulator)
+
+    assert entry.state is ConfigEntryState.LOADED
+    assert entry.data[CONF_TOKEN]
+    assert entry.data[CONF_HOST] == dss_simulator.host
+
+    # a light for every area of every room and the apartment, below their zone device
+    registry = entity_registry.async_get(hass)
+    light = registry.async_get(LIGHT)
+    assert light is not None
+    assert light.device_id is not None
+    assert len(hass.states.async_entity_ids("light")) == 5 * len(dss_simulator.zones)
+
+
+async def test_config_flow_rejects_wrong_password(
+    hass: HomeAssistant, enable_custom_integrations, dss_simulator: DSSimulator
+):
+    dss_simulator.password = "wrong"
+    result: dict = await hass.config_entries.flow.async_init(
+        DOMAIN,
+        context={"source": config_entries.SOURCE_USER},
+        data={
+            CONF_HOST: dss_simulator.host,
+            CONF_PORT: dss_simulator.port,
+            CONF_USERNAME: dss_simulator.username,
+            CONF_PASSWORD: "dssadmin",
+            CONF_ALIAS: "Apartment",
+            CONF_DELAY: 10,
+        },
+    )
+
+    assert result["type"] == data_entry_flow.RESULT_TYPE_FORM
+    assert result["errors"] == {"base": "communication_error"}
+    assert not hass.config_entries.async_entries(DOMAIN)
+
+
+async def test_scene_calls_reach_entities(
+    hass: HomeAssistant, enable_custom_integrations, dss_simulator_thread: DSSimulatorThread
+):
+    simulator: DSSimulator = dss_simulator_thread.simulator
+    await configure(hass=hass, simulator=simulator)
+
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_START)
+    await wait_for(lambda: simulator.connections)
+
+    # a wall switch turns the room on
+    await dss_simulator_thread.async_call(
+        simulator.emit(event=call_scene_event(zone_id=1, group_id=1, scene_id=5))
+    )
+    await wait_for(lambda: hass.states.get(LIGHT).state == STATE_ON)
+
+    # a command goes through the stack and is confirmed by its echo
+    await hass.services.async_call(
+        "light", "turn_off", {ATTR_ENTITY_ID: LIGHT}, blocking=True
+    )
+    await wait_for(lambda: hass.states.get(LIGHT).attributes.get("confirmed"))
+    assert hass.states.get(LIGHT).state == STATE_OFF
+    assert {"zone_id": 1, "group_id": 1, "scene_id": 0} in simulator.called_scenes
+
+
+async def test_meters_reported_later_get_sensors(
+    hass: HomeAssistant, enable_custom_integrations, dss_simulator: DSSimulator
+):
+    meters: dict = dss_simulator.meters
+    dss_simulator.meters = {}
+    entry: ConfigEntry = await configure(hass=hass, simulator=dss_simulator)
+    assert hass.states.get("sensor.circuit_1_power") is None
+
+    dss_simulator.meters = meters
+    entry_slug: str = slugify_entry(host=entry.data[CONF_HOST], port=entry.data[CONF_PORT])
+    await hass.data[DOMAIN][entry_slug]["metering"].async_refresh()
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.circuit_1_power").state == "100"
+    assert hass.states.get("sensor.apartment_power").state == "300"
+
+
+async def test_scene_devices_are_replaced_by_zone_devices(
+    hass: HomeAssistant, enable_custom_integrations, dss_simulator: DSSimulator
+):
+    apptoken: str = await DSAppTokenHandler(
+        host=dss_simulator.host,
+        port=dss_simulator.port,
+        username=dss_simulator.username,
+        password=dss_simulator.password,
+    ).request_apptoken()
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_TOKEN: apptoken,
+            CONF_HOST: dss_simulator.host,
+            CONF_PORT: dss_simulator.port,
+            CONF_ALIAS: "Apartment",
+            CONF_DELAY: 10,
+        },
+    )
+    entry.add_to_hass(hass)
+
+    # devices of a former version, one per scene, one of them for a scene that is gone
+    devices = device_registry.async_get(hass)
+    entities = entity_registry.async_get(hass)
+    scene_device = devices.async_get_or_create(
+        config_entry_id=entry.entry_id, identifiers={(DOMAIN, "1_1_0")}
+    )
+    gone_device = devices.async_get_or_create(
+        config_entry_id=entry.entry_id, identifiers={(DOMAIN, "9_1_0")}
+    )
+    entities.async_get_or_create(
+        "light",
+        DOMAIN,
+        "dslight_1_1_0",
+        suggested_object_id="hallway",
+        config_entry=entry,
+        device_id=scene_device.id,
+    )
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert devices.async_get(scene_device.id) is None
+    assert devices.async_get(gone_device.id) is None
+    light = entities.async_get("light.hallway")
+    assert light is not None
+    zone_device = devices.async_get(light.device_id)
+    assert zone_device.name == "Room 1"
+    assert zone_device.area_id is not None